@@ -0,0 +1,129 @@
+"""
+Token and cost log of the email editor's AI calls, shared by email-editor.py
+(which appends to it) and dashboard.py (which rolls it up).
+
+One compact JSON line per model request:
+
+    {"ts":1760000000.0,"email":"4812","action":"update","model":"deepseek/deepseek-chat",
+     "outcome":"ok","in":5210,"out":1830,"secs":14.2,"usd":0.003611}
+
+"in"/"out" are prompt/completion tokens as reported by OpenRouter; "est":1
+marks counts estimated from the prompt length and streamed chunks (e.g. a
+hedged request cancelled mid-stream, before its usage block arrived).
+Outcomes are ok, rejected (answered, but the answer failed validation),
+error and cancelled. Requests that never generated anything (HTTP errors,
+hedges cancelled before their first token) are logged with zero tokens and
+cost, as OpenRouter doesn't bill them. The file is rotated to <name>.1 at
+MAX_BYTES, so roll-ups cover the current and the previous generation.
+"""
+
+import fcntl
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+MAX_BYTES = 16 * 1024 * 1024    # rotate the log at this size
+LARGEST_PROMPTS = 10            # biggest prompts listed in a roll-up
+
+
+class UsageLog:
+    """Append-only JSONL of per-call usage records. Safe across threads and processes."""
+
+    def __init__(self, path: Path, max_bytes: int = MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def record(self, **fields):
+        """Append one record, stamped with the current time."""
+        line = json.dumps({"ts": round(time.time(), 1), **fields}, separators=(",", ":")) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_name(self.path.name + ".lock"), "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    if self.path.stat().st_size >= self.max_bytes:
+                        self.path.replace(self.path.with_name(self.path.name + ".1"))
+                except FileNotFoundError:
+                    pass
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+
+    def records(self, since: float = 0):
+        """Yield records newer than `since` (epoch seconds), oldest first."""
+        for path in (self.path.with_name(self.path.name + ".1"), self.path):
+            try:
+                f = open(path, encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by a crash
+                    if record.get("ts", 0) >= since:
+                        yield record
+
+    def rollup(self, days: int = 30) -> dict:
+        """Calls, tokens and cost over the last `days`, by day, model and action.
+
+        "rows" has one entry per (day, model, action) for charting; by_model
+        and by_action include the average prompt size, and largest_prompts
+        lists the biggest single requests, to spot prompts that are growing.
+        """
+        since = time.time() - days * 86400
+        groups = {"by_day": defaultdict(_bucket), "by_model": defaultdict(_bucket),
+                  "by_action": defaultdict(_bucket), "rows": defaultdict(_bucket)}
+        total = _bucket()
+        largest = []
+        for record in self.records(since):
+            day = datetime.fromtimestamp(record["ts"]).strftime("%Y-%m-%d")
+            model = record.get("model", "")
+            action = record.get("action", "other")
+            for bucket in (total, groups["by_day"][day], groups["by_model"][model],
+                           groups["by_action"][action], groups["rows"][(day, model, action)]):
+                _add(bucket, record)
+            largest.append(record)
+            if len(largest) > 4 * LARGEST_PROMPTS:
+                largest = sorted(largest, key=lambda r: r.get("in", 0), reverse=True)[:LARGEST_PROMPTS]
+        largest = sorted(largest, key=lambda r: r.get("in", 0), reverse=True)[:LARGEST_PROMPTS]
+        return {
+            "days": days,
+            "total": _finish(total),
+            "by_day": [{"day": day, **_finish(b)} for day, b in sorted(groups["by_day"].items())],
+            "by_model": [{"model": model, **_finish(b)} for model, b in sorted(groups["by_model"].items())],
+            "by_action": [{"action": action, **_finish(b)} for action, b in sorted(groups["by_action"].items())],
+            "rows": [{"day": day, "model": model, "action": action, **_finish(b)}
+                     for (day, model, action), b in sorted(groups["rows"].items())],
+            "largest_prompts": largest,
+        }
+
+
+def _bucket() -> dict:
+    return {"calls": 0, "failed": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0, "secs": 0.0}
+
+
+def _add(bucket: dict, record: dict):
+    bucket["calls"] += 1
+    bucket["failed"] += record.get("outcome") != "ok"
+    bucket["prompt_tokens"] += record.get("in", 0)
+    bucket["completion_tokens"] += record.get("out", 0)
+    bucket["cost"] += record.get("usd", 0.0)
+    bucket["secs"] += record.get("secs", 0.0)
+
+
+def _finish(bucket: dict) -> dict:
+    calls = bucket["calls"] or 1
+    return {
+        "calls": bucket["calls"],
+        "failed": bucket["failed"],
+        "prompt_tokens": bucket["prompt_tokens"],
+        "completion_tokens": bucket["completion_tokens"],
+        "cost": round(bucket["cost"], 6),
+        "avg_prompt_tokens": round(bucket["prompt_tokens"] / calls),
+        "avg_secs": round(bucket["secs"] / calls, 2),
+    }
@@ -0,0 +1,324 @@
+"""
+Cached index of the country articles, shared by email-editor.py and dashboard.py.
+
+Keeps every content/countries/*.md parsed (frontmatter fields, FAQ count,
+H2/H3 section offsets) in memory, keyed by path. Entries are revalidated
+against the file's mtime, size and inode, so edits by write_article(), the
+GitHub workflow or a git pull are picked up. Directory changes come from
+inotify when the platform has it, otherwise from a throttled mtime scan.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from pathlib import Path
+
+log = logging.getLogger("article-index")
+
+SCAN_INTERVAL = 2.0     # seconds between directory scans when inotify is unavailable
+
+# inotify(7) constants
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def _scalar(text: str):
+    """Decode a frontmatter scalar (double-quoted strings are JSON-compatible)."""
+    text = text.strip()
+    if text.startswith('"') and text.endswith('"') and len(text) > 1:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return text[1:-1]
+    if text.startswith("'") and text.endswith("'") and len(text) > 1:
+        return text[1:-1].replace("''", "'")
+    return text
+
+
+def parse_frontmatter(block: str) -> dict:
+    """Parse the flat YAML subset the article generator writes.
+
+    Handles `key: value`, lists of scalars and lists of flat mappings
+    (faq, references) -- enough for region, best_months, lastmod and FAQ
+    counts without a YAML dependency.
+    """
+    fields = {}
+    key = None
+    for line in block.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        top = re.match(r"([A-Za-z_][\w-]*):\s*(.*)$", line)
+        if top:
+            key, value = top.group(1), top.group(2)
+            fields[key] = _scalar(value) if value.strip() else []
+            continue
+        if key is None or not isinstance(fields[key], list):
+            continue
+        item = re.match(r"\s*-\s+(.*)$", line)
+        if item:
+            pair = re.match(r"([A-Za-z_][\w-]*):\s+(.*)$", item.group(1))
+            fields[key].append({pair.group(1): _scalar(pair.group(2))} if pair else _scalar(item.group(1)))
+            continue
+        pair = re.match(r"\s+([A-Za-z_][\w-]*):\s+(.*)$", line)
+        if pair and fields[key] and isinstance(fields[key][-1], dict):
+            fields[key][-1][pair.group(1)] = _scalar(pair.group(2))
+    return fields
+
+
+def parse_article(content: str) -> dict:
+    """Frontmatter fields plus H2/H3 section offsets into `content`.
+
+    Sections map heading text to (level, start, end) character offsets;
+    the same heading rules as split_article() (fenced code is skipped).
+    """
+    match = re.match(r"---\n(.*?\n)---\n", content, re.DOTALL)
+    frontmatter = parse_frontmatter(match.group(1)) if match else {}
+    body_start = match.end() if match else 0
+
+    sections = {}
+    order = []
+    offset = body_start
+    in_fence = False
+    for line in content[body_start:].splitlines(keepends=True):
+        if line.startswith("```"):
+            in_fence = not in_fence
+        heading = None if in_fence else re.match(r"(#{2,3}) (.+?)\s*$", line)
+        if heading:
+            if order:
+                sections[order[-1]][2] = offset
+            title = heading.group(2)
+            sections[title] = [len(heading.group(1)), offset, len(content)]
+            order.append(title)
+        offset += len(line)
+
+    faq = frontmatter.get("faq")
+    return {
+        "frontmatter": frontmatter,
+        "sections": {title: tuple(span) for title, span in sections.items()},
+        "section_order": order,
+        "faq_count": len(faq) if isinstance(faq, list) else 0,
+        "word_count": len(content[body_start:].split()),
+    }
+
+# ---------------------------------------------------------------------------
+# inotify (Linux only, via libc)
+# ---------------------------------------------------------------------------
+
+class _Inotify:
+    """Minimal non-blocking inotify watch on one directory."""
+
+    def __init__(self, directory: Path):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify not available")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+
+    def read(self):
+        """Drain pending events. Returns (changed file names, needs_rescan)."""
+        names = set()
+        rescan = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            pos = 0
+            while pos + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, pos)
+                name = data[pos + _EVENT_HEADER.size:pos + _EVENT_HEADER.size + length]
+                pos += _EVENT_HEADER.size + length
+                if mask & (IN_Q_OVERFLOW | IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    rescan = True
+                elif name:
+                    names.add(os.fsdecode(name.rstrip(b"\0")))
+        return names, rescan
+
+    def close(self):
+        os.close(self.fd)
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class ArticleIndex:
+    """Parsed articles keyed by path, kept in step with the directory.
+
+    slugs() and get() are dict lookups once the index is warm; read()
+    additionally stats the one file so a change that no event reported yet
+    is never served stale. Thread-safe.
+    """
+
+    def __init__(self, content_dir: Path, scan_interval: float = SCAN_INTERVAL):
+        self.content_dir = Path(content_dir)
+        self.scan_interval = scan_interval
+        self._entries = {}          # path -> entry dict
+        self._lock = threading.Lock()
+        self._watch = None
+        self._watch_failed = False
+        self._last_scan = 0.0
+        self._scanned = False
+
+    # -- public API ---------------------------------------------------------
+
+    def slugs(self) -> list:
+        """Sorted article slugs (filenames without .md, _index excluded)."""
+        with self._lock:
+            self._sync()
+            return sorted(entry["slug"] for entry in self._entries.values())
+
+    def get(self, slug: str):
+        """Parsed entry for `slug` (frontmatter, sections, counts), or None."""
+        with self._lock:
+            self._sync()
+            return self._validated(self._path(slug))
+
+    def read(self, slug: str) -> str:
+        """Article markdown. Raises FileNotFoundError like Path.read_text()."""
+        entry = self.get(slug)
+        if entry is None:
+            raise FileNotFoundError(self._path(slug))
+        return entry["content"]
+
+    def section(self, slug: str, title: str):
+        """Text of the H2/H3 section with this heading, or None."""
+        entry = self.get(slug)
+        span = entry and entry["sections"].get(title)
+        return entry["content"][span[1]:span[2]] if span else None
+
+    def invalidate(self, slug: str = None):
+        """Forget one article (or all) so the next lookup re-reads it."""
+        with self._lock:
+            if slug is None:
+                self._entries.clear()
+                self._scanned = False
+            else:
+                self._entries.pop(self._path(slug), None)
+
+    def summary(self) -> list:
+        """One JSON-friendly dict per article, for the dashboard."""
+        rows = []
+        for slug in self.slugs():
+            entry = self.get(slug)
+            if entry is None:
+                continue
+            fm = entry["frontmatter"]
+            rows.append({
+                "slug": slug,
+                "title": fm.get("title", ""),
+                "region": fm.get("region", ""),
+                "best_months": fm.get("best_months", ""),
+                "lastmod": fm.get("lastmod", ""),
+                "faq_count": entry["faq_count"],
+                "sections": len(entry["sections"]),
+                "words": entry["word_count"],
+            })
+        return rows
+
+    # -- internals ------------------------------------------------------------
+
+    def _path(self, slug: str) -> Path:
+        return self.content_dir / f"{slug}.md"
+
+    @staticmethod
+    def _is_article(name: str) -> bool:
+        return name.endswith(".md") and name != "_index.md"
+
+    def _sync(self):
+        """Apply directory changes: inotify events, or a throttled rescan."""
+        if self._watch is None and not self._watch_failed:
+            try:
+                self._watch = _Inotify(self.content_dir)
+                self._scanned = False
+                log.info(f"Watching {self.content_dir} with inotify")
+            except (OSError, AttributeError) as e:
+                self._watch_failed = True
+                log.info(f"inotify unavailable ({e}) -- scanning every {self.scan_interval}s")
+
+        if self._watch is not None:
+            names, rescan = self._watch.read()
+            if rescan:
+                # Directory replaced or queue overflowed -- re-arm and rescan
+                self._watch.close()
+                self._watch = None
+                self._scanned = False
+                return self._sync() if self.content_dir.is_dir() else self._scan()
+            for name in names:
+                if self._is_article(name):
+                    self._validated(self.content_dir / name)
+            if not self._scanned:
+                self._scan()
+        elif not self._scanned or time.monotonic() - self._last_scan >= self.scan_interval:
+            self._scan()
+
+    def _scan(self):
+        seen = set()
+        try:
+            with os.scandir(self.content_dir) as it:
+                for item in it:
+                    if self._is_article(item.name) and item.is_file():
+                        path = Path(item.path)
+                        seen.add(path)
+                        self._validated(path, item.stat())
+        except FileNotFoundError:
+            pass
+        for path in set(self._entries) - seen:
+            del self._entries[path]
+        self._scanned = True
+        self._last_scan = time.monotonic()
+
+    def _validated(self, path: Path, stat=None):
+        """Return the entry for `path`, re-parsing if mtime/size/inode moved."""
+        try:
+            stat = stat or path.stat()
+        except FileNotFoundError:
+            self._entries.pop(path, None)
+            return None
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        entry = self._entries.get(path)
+        if entry is not None and entry["key"] == key:
+            return entry
+        try:
+            content = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            self._entries.pop(path, None)
+            return None
+        entry = {"slug": path.stem, "path": str(path), "key": key, "content": content,
+                 **parse_article(content)}
+        self._entries[path] = entry
+        return entry
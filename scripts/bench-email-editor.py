@@ -0,0 +1,879 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark for email-editor.py.
+
+Runs the real editor -- main() over IMAP IDLE, or process_email() one
+email at a time -- against local stand-ins: a fake IMAP/SMTP server, a
+fake OpenRouter endpoint that streams canned replies with configurable
+latency, throughput and failure rate, and `git` / `hugo` / `node` stubs
+on PATH. A corpus of instruction emails is replayed into the mailbox and
+every reply is timed from delivery to the moment it reaches the SMTP
+stand-in.
+
+Reports throughput, end-to-end and per-stage p50/p95/p99 latency (from the
+editor's own metrics spans) and peak RSS, appends the result to
+.email-editor/bench/results.jsonl tagged with the git commit, and prints
+the change against the last run of the same configuration on another
+commit.
+
+Usage:
+    python3 scripts/bench-email-editor.py                       # 40 emails, burst
+    python3 scripts/bench-email-editor.py --emails 200 --rate 60 --ai-failure-rate 0.1
+    python3 scripts/bench-email-editor.py --mode direct --corpus my-emails.jsonl
+"""
+
+import argparse
+import email
+import importlib.util
+import imaplib
+import json
+import logging
+import os
+import random
+import re
+import resource
+import select
+import shutil
+import smtplib
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from email.header import Header, decode_header, make_header
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_DIR = SCRIPTS_DIR.parent
+EDITOR_SCRIPT = SCRIPTS_DIR / "email-editor.py"
+RESULTS_FILE = REPO_DIR / ".email-editor" / "bench" / "results.jsonl"
+
+DEFAULT_EMAILS = 40
+DEFAULT_TIMEOUT = 900           # seconds to wait for every reply before giving up
+STARTUP_TIMEOUT = 30            # seconds for the editor to log in and start idling
+STREAM_CHUNK_CHARS = 16         # characters per fake SSE delta (~4 tokens)
+CHARS_PER_TOKEN = 4
+
+# Instruction templates for the built-in corpus ({name} = country name)
+UPDATE_TEMPLATES = [
+    ("{name}: fix the April temperature",
+     "The average April high in {name} is about 2 degrees warmer than the article says. Please correct it."),
+    ("{name}: add a festival section",
+     "Please add a short section about the biggest spring festival in {name} and when to book for it."),
+    ("Update {name} FAQ",
+     "Add a FAQ entry on whether {name} is good for a first trip in the shoulder season."),
+    ("{name} budget tips",
+     "Mention that accommodation prices in {name} drop noticeably in the weeks after the peak season."),
+    ("{name}: rainy season wording",
+     "Tweak the rainy season paragraph for {name} so it is less alarming and mentions indoor activities."),
+]
+CREATE_TEMPLATE = ("New article: {name}", "Please write a new article about {name}.")
+AMBIGUOUS_TEMPLATE = ("Quick question", "Which of our guides gets the most traffic in winter?")
+
+# ---------------------------------------------------------------------------
+# Stubs for git / hugo / node (written as executables on PATH)
+# ---------------------------------------------------------------------------
+
+GIT_STUB = r'''
+import os, sys, time
+from pathlib import Path
+
+root = Path.cwd()
+stamp = root / ".bench-git-stamp"
+time.sleep(float(os.environ.get("BENCH_GIT_LATENCY", "0")))
+
+
+def changed():
+    since = stamp.stat().st_mtime_ns if stamp.exists() else 0
+    return [p for p in sorted((root / "content" / "countries").glob("*.md"))
+            if p.stat().st_mtime_ns > since]
+
+
+command = sys.argv[1] if len(sys.argv) > 1 else ""
+if command == "status":
+    sys.stdout.write("".join(f" M {p.relative_to(root)}\0" for p in changed()))
+elif command == "commit":
+    if not changed():
+        print("nothing to commit, working tree clean")
+        sys.exit(1)
+    stamp.touch()
+'''
+
+HUGO_STUB = r'''
+import os, sys, time
+from pathlib import Path
+
+content = Path.cwd() / "content" / "countries"
+latency = float(os.environ.get("BENCH_HUGO_LATENCY", "0"))
+
+
+def snapshot():
+    return {p.name: p.stat().st_mtime_ns for p in content.glob("*.md")}
+
+
+if sys.argv[1:2] == ["server"]:
+    time.sleep(float(os.environ.get("BENCH_HUGO_STARTUP", "0")))
+    print("Web Server is available at http://127.0.0.1:1314/ (bind address 127.0.0.1)", flush=True)
+    seen = snapshot()
+    rebuilds = 0
+    while True:
+        time.sleep(0.05)
+        current = snapshot()
+        if current != seen:
+            rebuilds += 1
+            print(f"Change detected, rebuilding site (#{rebuilds}).", flush=True)
+            time.sleep(latency)
+            seen = current
+            print(f"Total in {int(latency * 1000)} ms", flush=True)
+else:
+    time.sleep(float(os.environ.get("BENCH_HUGO_COLD_LATENCY", "0")))
+'''
+
+NODE_STUB = r'''
+import os, sys, time
+from pathlib import Path
+
+slug = sys.argv[-1]
+step = float(os.environ.get("BENCH_CREATE_STEP", "0"))
+name = slug.replace("-", " ").title()
+template = Path(os.environ["BENCH_ARTICLE_TEMPLATE"])
+template_name = os.environ["BENCH_TEMPLATE_NAME"]
+for number, title in enumerate(["Generating article content", "Generating hero image",
+                                "Generating climate chart", "Building Hugo markdown"], 1):
+    print(f"--- Step {number}: {title} ---", flush=True)
+    time.sleep(step)
+target = Path.cwd() / "content" / "countries" / f"{slug}.md"
+target.write_text(template.read_text(encoding="utf-8").replace(template_name, name), encoding="utf-8")
+print(f"Written to: {target}", flush=True)
+print("=== Done! ===", flush=True)
+'''
+
+
+def write_stubs(bin_dir: Path):
+    """Install the git/hugo/node stubs as executables in `bin_dir`."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, source in (("git", GIT_STUB), ("hugo", HUGO_STUB), ("node", NODE_STUB)):
+        path = bin_dir / name
+        path.write_text(f"#!{sys.executable}\n{source}")
+        path.chmod(0o755)
+
+# ---------------------------------------------------------------------------
+# Fake OpenRouter (streamed chat completions)
+# ---------------------------------------------------------------------------
+
+def fake_completion(system: str, user: str) -> str:
+    """A plausible reply for each of the editor's prompts."""
+    if system.startswith("You classify"):
+        subject = re.search(r"Email subject: (.*)", user)
+        body = re.search(r"Email body: (.*)", user)
+        slugs = re.search(r"Existing article slugs: (.*)", user)
+        text = f"{subject.group(1) if subject else ''} {body.group(1) if body else ''}".lower()
+        slug = next((s for s in (slugs.group(1).split(", ") if slugs else [])
+                     if s and s.replace("-", " ") in text), None)
+        if slug is None:
+            return json.dumps({"action": "unknown", "summary": text[:60]})
+        return json.dumps({"action": "update_article", "target_slug": slug,
+                           "summary": subject.group(1) if subject else "", "details": text})
+
+    if system.startswith("You plan minimal edits"):
+        outline = user.split("OUTLINE:\n", 1)[-1].splitlines()
+        blocks = [line.split(":", 1)[0] for line in outline if not line.startswith("fm.")]
+        words = set(re.findall(r"[a-z]{5,}", user.split("OUTLINE:", 1)[0].lower()))
+        chosen = next((line.split(":", 1)[0] for line in outline
+                       if not line.startswith("fm.") and words & set(re.findall(r"[a-z]{5,}", line.lower()))),
+                      blocks[1] if len(blocks) > 1 else (blocks or ["s.0"])[0])
+        return json.dumps({"blocks": [chosen]})
+
+    if "<<<BLOCK" in system:
+        blocks = re.findall(r"<<<BLOCK ([\w.-]+)>>>\n(.*?)\n<<<END>>>", user, re.DOTALL)
+        return "\n".join(
+            f"<<<BLOCK {block_id}>>>\n{text if block_id.startswith('fm.') else text + EDIT_SENTENCE}\n<<<END>>>"
+            for block_id, text in blocks
+        )
+
+    if "COMPLETE updated" in system:
+        article = user.split("CURRENT ARTICLE:\n", 1)[-1]
+        return article.rstrip("\n") + EDIT_SENTENCE + "\n"
+
+    return "Acknowledged. " * 10
+
+
+EDIT_SENTENCE = ("\n\nLocal tip: book accommodation a few weeks ahead in the busiest months, "
+                 "and keep a day free for weather changes.")
+
+
+class FakeOpenRouter(ThreadingHTTPServer):
+    """OpenAI-compatible streaming endpoint with injected latency and failures."""
+
+    daemon_threads = True
+
+    def __init__(self, ttft: float, tps: float, jitter: float, failure_rate: float,
+                 model_ttft: dict, model_failure_rate: dict, seed: int):
+        super().__init__(("127.0.0.1", 0), _OpenRouterHandler)
+        self.ttft = ttft
+        self.tps = tps
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.model_ttft = model_ttft
+        self.model_failure_rate = model_failure_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v1/chat/completions"
+
+    def draw(self, model: str):
+        """(time to first token, fail?) for one request."""
+        with self.random_lock:
+            self.requests += 1
+            ttft = self.model_ttft.get(model, self.ttft) * self.random.lognormvariate(0, self.jitter)
+            fail = self.random.random() < self.model_failure_rate.get(model, self.failure_rate)
+            self.failures += fail
+        return ttft, fail
+
+
+class _OpenRouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        messages = {m["role"]: m["content"] for m in request["messages"]}
+        ttft, fail = self.server.draw(request["model"])
+        time.sleep(ttft)
+        if fail:
+            body = json.dumps({"error": {"code": 502, "message": "bench: injected upstream failure"}}).encode()
+            self.send_response(502)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        reply = fake_completion(messages.get("system", ""), messages.get("user", ""))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pause = STREAM_CHUNK_CHARS / CHARS_PER_TOKEN / self.server.tps
+        try:
+            for i in range(0, len(reply), STREAM_CHUNK_CHARS):
+                self._event({"choices": [{"delta": {"content": reply[i:i + STREAM_CHUNK_CHARS]}}]})
+                time.sleep(pause)
+            prompt = sum(len(m) for m in messages.values()) // CHARS_PER_TOKEN
+            completion = len(reply) // CHARS_PER_TOKEN
+            self._event({"choices": [{"delta": {}, "finish_reason": "stop"}],
+                         "usage": {"prompt_tokens": prompt, "completion_tokens": completion,
+                                   "total_tokens": prompt + completion}})
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # the editor cancelled a hedged request
+
+    def _event(self, data: dict):
+        self._chunk(f"data: {json.dumps(data)}\n\n".encode())
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+# ---------------------------------------------------------------------------
+# Fake mail server (IMAP with IDLE for ingest, SMTP for replies)
+# ---------------------------------------------------------------------------
+
+class Mailbox:
+    """INBOX contents plus the replies received, with timestamps."""
+
+    def __init__(self, sender: str):
+        self.sender = sender
+        self.messages = []
+        self.replies = []
+        self.errors = 0
+        self.logins = 0
+        self.idling = 0
+        self._waiting = {}          # normalized subject -> deque of message indexes
+        self._cond = threading.Condition()
+
+    def deliver(self, subject: str, body: str):
+        with self._cond:
+            index = len(self.messages)
+            self.messages.append({
+                "uid": index + 1, "subject": subject, "body": body, "seen": False,
+                "message_id": f"<bench-{index + 1}-{time.time_ns()}@bench.local>",
+                "delivered": time.time(), "replied": None,
+            })
+            self._waiting.setdefault(subject, deque()).append(index)
+            self._cond.notify_all()
+
+    def record_reply(self, subject: str):
+        with self._cond:
+            original = re.sub(r" \(need clarification\)$", "", subject.removeprefix("Re: "))
+            waiting = self._waiting.get(original)
+            if waiting:
+                self.messages[waiting.popleft()]["replied"] = time.time()
+            else:
+                self.errors += 1
+            self.replies.append((time.time(), subject))
+            self._cond.notify_all()
+
+    def wait_for_replies(self, count: int, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self.replies) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def wait_for(self, predicate, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(predicate, timeout)
+
+
+class _IMAPHandler(socketserver.StreamRequestHandler):
+    """Just enough IMAP4rev1 for the editor: LOGIN, SELECT, STATUS, UID SEARCH/FETCH/STORE, IDLE."""
+
+    CAPABILITIES = "IMAP4rev1 IDLE UIDPLUS MOVE"
+
+    def handle(self):
+        self.selected = None
+        self.known = 0
+        self._send(f"* OK [CAPABILITY {self.CAPABILITIES}] bench IMAP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.decode().rstrip("\r\n").split(" ", 2)
+            tag, command = parts[0], parts[1].upper() if len(parts) > 1 else ""
+            args = parts[2] if len(parts) > 2 else ""
+            if command == "UID":
+                sub, _, args = args.partition(" ")
+                command = f"UID {sub.upper()}"
+            handler = getattr(self, "cmd_" + command.replace(" ", "_"), None)
+            if handler is None:
+                self._send(f"{tag} BAD unsupported command {command}")
+                continue
+            if handler(tag, args) is False:
+                return
+
+    def _send(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def _inbox(self):
+        box = self.server.mailbox
+        return box.messages if self.selected == "INBOX" else []
+
+    def _report_new(self):
+        with self.server.mailbox._cond:
+            count = len(self._inbox())
+        if self.selected == "INBOX" and count > self.known:
+            self.known = count
+            self._send(f"* {count} EXISTS")
+            return True
+        return False
+
+    def cmd_CAPABILITY(self, tag, args):
+        self._send(f"* CAPABILITY {self.CAPABILITIES}")
+        self._send(f"{tag} OK CAPABILITY completed")
+
+    def cmd_LOGIN(self, tag, args):
+        with self.server.mailbox._cond:
+            self.server.mailbox.logins += 1
+        self._send(f"{tag} OK LOGIN completed")
+
+    def cmd_LOGOUT(self, tag, args):
+        self._send("* BYE bench IMAP closing")
+        self._send(f"{tag} OK LOGOUT completed")
+        return False
+
+    def cmd_NOOP(self, tag, args):
+        self._report_new()
+        self._send(f"{tag} OK NOOP completed")
+
+    def cmd_SELECT(self, tag, args):
+        self.selected = args.strip('"')
+        messages = self._inbox()
+        self.known = len(messages)
+        self._send(f"* {self.known} EXISTS")
+        self._send("* 0 RECENT")
+        self._send("* OK [UIDVALIDITY 1] UIDs valid")
+        self._send(f"* OK [UIDNEXT {self.known + 1}] Predicted next UID")
+        self._send(f"{tag} OK [READ-WRITE] SELECT completed")
+
+    def cmd_STATUS(self, tag, args):
+        mailbox = args.split(" ", 1)[0].strip('"')
+        self._send(f"* STATUS {mailbox} (UIDNEXT 1 UIDVALIDITY 1)")
+        self._send(f"{tag} OK STATUS completed")
+
+    def cmd_UID_SEARCH(self, tag, args):
+        low = re.search(r"UID (\d+):\*", args)
+        unseen = "UNSEEN" in args.upper()
+        with self.server.mailbox._cond:
+            uids = [m["uid"] for m in self._inbox()
+                    if m["uid"] >= int(low.group(1) if low else 1) and not (unseen and m["seen"])]
+        self._send("* SEARCH" + "".join(f" {uid}" for uid in uids))
+        self._send(f"{tag} OK SEARCH completed")
+
+    def cmd_UID_FETCH(self, tag, args):
+        uid_set, _, items = args.partition(" ")
+        wanted = {int(uid) for uid in uid_set.split(",")}
+        messages = [m for m in self._inbox() if m["uid"] in wanted]
+        sender = self.server.mailbox.sender
+        for m in messages:
+            body = m["body"].encode()
+            if "BODYSTRUCTURE" in items:
+                subject = m["subject"] if m["subject"].isascii() else Header(m["subject"], "utf-8").encode()
+                header = (f"From: Bench <{sender}>\r\nSubject: {subject}\r\n"
+                          f"Message-ID: {m['message_id']}\r\n\r\n").encode()
+                lines = body.count(b"\n") + 1
+                structure = f'("TEXT" "PLAIN" ("CHARSET" "UTF-8") NIL NIL "8BIT" {len(body)} {lines})'
+                self.wfile.write(
+                    f"* {m['uid']} FETCH (UID {m['uid']} BODYSTRUCTURE {structure} "
+                    f"BODY[HEADER.FIELDS (FROM SUBJECT MESSAGE-ID)] {{{len(header)}}}\r\n".encode()
+                    + header + b")\r\n"
+                )
+            else:
+                self.wfile.write(f"* {m['uid']} FETCH (UID {m['uid']} BODY[1]<0> {{{len(body)}}}\r\n".encode()
+                                 + body + b")\r\n")
+        self._send(f"{tag} OK FETCH completed")
+
+    def cmd_UID_STORE(self, tag, args):
+        uids = {int(uid) for uid in args.split(" ", 1)[0].split(",")}
+        if "\\Seen" in args:
+            with self.server.mailbox._cond:
+                for m in self._inbox():
+                    if m["uid"] in uids:
+                        m["seen"] = True
+        self._send(f"{tag} OK STORE completed")
+
+    def cmd_IDLE(self, tag, args):
+        box = self.server.mailbox
+        self._send("+ idling")
+        self.wfile.flush()
+        with box._cond:
+            box.idling += 1
+            box._cond.notify_all()
+        while True:
+            self._report_new()
+            ready, _, _ = select.select([self.connection], [], [], 0.05)
+            if not ready:
+                continue
+            line = self.rfile.readline()
+            if not line:
+                return False
+            if line.strip().upper() == b"DONE":
+                break
+        self._send(f"{tag} OK IDLE terminated")
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Accepts every message; the Subject is recorded as a reply."""
+
+    def handle(self):
+        self._send("220 bench SMTP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode(errors="replace").split(" ", 1)[0].strip().upper()
+            if verb == "EHLO":
+                self._send("250-bench\r\n250-AUTH PLAIN\r\n250 8BITMIME")
+            elif verb == "AUTH":
+                self._send("235 Authentication successful")
+            elif verb == "DATA":
+                self._send("354 End data with <CR><LF>.<CR><LF>")
+                data = bytearray()
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk == b".\r\n":
+                        break
+                    data += chunk[1:] if chunk.startswith(b"..") else chunk
+                message = email.message_from_bytes(bytes(data))
+                self.server.mailbox.record_reply(str(make_header(decode_header(message["Subject"] or ""))))
+                self._send("250 Queued")
+            elif verb == "QUIT":
+                self._send("221 Bye")
+                return
+            else:
+                self._send("250 OK")
+
+    def _send(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+
+class _MailServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handler, mailbox: Mailbox):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.mailbox = mailbox
+
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, name=type(server).__name__, daemon=True).start()
+    return server
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+def load_corpus(path: Path) -> list:
+    """Instruction emails from a JSONL file of {"subject": ..., "body": ...}."""
+    corpus = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            item = json.loads(line)
+            corpus.append({"subject": item.get("subject", ""), "body": item.get("body", "")})
+    return corpus
+
+
+def builtin_corpus(project: Path, count: int, create_share: float, rng: random.Random) -> list:
+    """Mostly single-article updates, a few new articles and an ambiguous email."""
+    countries = {c["slug"]: c["name"] for c in json.loads((project / "data" / "countries.json").read_text())}
+    existing = sorted(p.stem for p in (project / "content" / "countries").glob("*.md") if p.stem != "_index")
+    missing = [slug for slug in countries if slug not in existing]
+    corpus = []
+    for i in range(count):
+        if rng.random() < create_share and missing:
+            subject, body = CREATE_TEMPLATE
+            name = countries[missing.pop(rng.randrange(len(missing)))]
+        elif i and i % 25 == 0:
+            subject, body = AMBIGUOUS_TEMPLATE
+            name = ""
+        else:
+            subject, body = UPDATE_TEMPLATES[i % len(UPDATE_TEMPLATES)]
+            name = countries.get(existing[(i // len(UPDATE_TEMPLATES)) % len(existing)], "")
+        corpus.append({"subject": subject.format(name=name), "body": body.format(name=name)})
+    return corpus
+
+# ---------------------------------------------------------------------------
+# Workspace and editor setup
+# ---------------------------------------------------------------------------
+
+def make_workspace(root: Path, args) -> Path:
+    """A scratch HOME with a copy of the site content and the stubs on PATH.
+
+    The editor derives PROJECT_DIR and STATE_DIR from HOME, so pointing HOME
+    here keeps the benchmark away from the real checkout and state.
+    """
+    home = root / "home"
+    project = home / "Projects" / "when-to-go"
+    (project / "content").mkdir(parents=True)
+    shutil.copytree(REPO_DIR / "content" / "countries", project / "content" / "countries")
+    shutil.copytree(REPO_DIR / "data", project / "data")
+    (project / ".bench-git-stamp").touch()
+    (home / ".env").write_text("")
+    write_stubs(root / "bin")
+
+    template = next(p for p in sorted((project / "content" / "countries").glob("*.md")) if p.stem != "_index")
+    os.environ.update({
+        "HOME": str(home),
+        "PATH": f"{root / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}",
+        "OPENROUTER_API_KEY": "bench",
+        "EMAIL_EDITOR_WORKERS": str(args.workers),
+        "EMAIL_EDITOR_METRICS_PORT": "0",
+        "BENCH_GIT_LATENCY": str(args.git_latency),
+        "BENCH_HUGO_LATENCY": str(args.hugo_latency),
+        "BENCH_HUGO_COLD_LATENCY": str(args.hugo_cold_latency),
+        "BENCH_HUGO_STARTUP": "0.5",
+        "BENCH_CREATE_STEP": str(args.create_step),
+        "BENCH_ARTICLE_TEMPLATE": str(template),
+        "BENCH_TEMPLATE_NAME": template.stem.replace("-", " ").title(),
+    })
+    return project
+
+
+def load_editor(args, ai_url: str, imap_port: int, smtp_port: int):
+    """Import email-editor.py (after make_workspace) and point it at the stand-ins."""
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    spec = importlib.util.spec_from_file_location("email_editor", EDITOR_SCRIPT)
+    ee = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(ee)
+
+    ee.OPENROUTER_URL = ai_url
+    ee.IMAP_HOST = ee.SMTP_HOST = "127.0.0.1"
+    ee.IMAP_PORT = imap_port
+    ee.SMTP_PORT = smtp_port
+    ee.METRICS_WINDOW = 1_000_000
+    ee.DeployCoalescer = partial(ee.DeployCoalescer, window=args.deploy_window)
+    ee.EditCoalescer = partial(ee.EditCoalescer, window=args.edit_window)
+
+    # The stand-ins speak plain TCP, so only the TLS handshakes are swapped out
+    def connect_imap():
+        conn = imaplib.IMAP4(ee.IMAP_HOST, ee.IMAP_PORT)
+        conn.login(ee.EMAIL_USER, ee.EMAIL_PASS)
+        return conn
+
+    def connect_smtp(outbox):
+        server = smtplib.SMTP(ee.SMTP_HOST, ee.SMTP_PORT, timeout=ee.SMTP_TIMEOUT)
+        server.login(ee.EMAIL_USER, ee.EMAIL_PASS)
+        outbox._server = server
+        outbox._last_used = time.monotonic()
+
+    ee.connect_imap = connect_imap
+    ee.Outbox._connect = connect_smtp
+
+    level = logging.INFO if args.verbose else logging.WARNING
+    for name in ("email-editor", "article-index"):
+        logging.getLogger(name).setLevel(level)
+    return ee
+
+# ---------------------------------------------------------------------------
+# Runs
+# ---------------------------------------------------------------------------
+
+def replay(mailbox: Mailbox, corpus: list, rate: float):
+    """Deliver the corpus into INBOX, all at once (rate 0) or at `rate` emails/minute."""
+    interval = 60.0 / rate if rate > 0 else 0.0
+    start = time.monotonic()
+    for i, item in enumerate(corpus):
+        delay = start + i * interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        mailbox.deliver(item["subject"], item["body"])
+
+
+def run_main(ee, mailbox: Mailbox, corpus: list, args) -> bool:
+    """Run the editor's main() loop and replay the corpus over IMAP."""
+    threading.Thread(target=ee.main, name="editor-main", daemon=True).start()
+    if not mailbox.wait_for(lambda: mailbox.idling > 0, STARTUP_TIMEOUT):
+        raise RuntimeError("editor never reached IMAP IDLE")
+    threading.Thread(target=replay, args=(mailbox, corpus, args.rate), name="replay", daemon=True).start()
+    return mailbox.wait_for_replies(len(corpus), args.timeout)
+
+
+def run_direct(ee, mailbox: Mailbox, corpus: list, args) -> bool:
+    """Call process_email() for each email in turn (no IMAP, no worker pool)."""
+    ee.outbox.start()
+    for item in corpus:
+        mailbox.deliver(item["subject"], item["body"])
+        try:
+            ee.process_email({**item, "from": ee.ALLOWED_SENDER, "message_id": ""})
+        except Exception as e:
+            ee.send_error_reply(e)
+    return mailbox.wait_for_replies(len(corpus), args.timeout)
+
+
+def percentiles(ee, samples: list) -> dict:
+    return {f"p{int(q * 100)}": ee._percentile(samples, q) for q in (0.5, 0.95, 0.99)}
+
+
+def summarize(ee, mailbox: Mailbox, ai: FakeOpenRouter, args, complete: bool, rss_baseline: int) -> dict:
+    replied = [m for m in mailbox.messages if m["replied"]]
+    latencies = [m["replied"] - m["delivered"] for m in replied]
+    first = min((m["delivered"] for m in mailbox.messages), default=0)
+    last = max((t for t, _ in mailbox.replies), default=first)
+    duration = max(last - first, 1e-9)
+    return {
+        "emails": len(mailbox.messages),
+        "replies": len(mailbox.replies),
+        "error_replies": mailbox.errors,
+        "complete": complete,
+        "duration_s": round(duration, 3),
+        "throughput_per_min": round(len(mailbox.replies) / duration * 60, 2),
+        "e2e_s": {k: v and round(v, 4) for k, v in percentiles(ee, latencies).items()},
+        "stages_s": {
+            name: {k: (round(v, 4) if isinstance(v, float) else v) for k, v in stats.items()}
+            for name, stats in sorted(ee.metrics.quantiles().items())
+        },
+        "counters": ee.metrics.counters(),
+        "ai_requests": ai.requests,
+        "ai_injected_failures": ai.failures,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "baseline_rss_mb": round(rss_baseline / 1024, 1),
+    }
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+def git_revision() -> tuple:
+    """(short commit, dirty?) of the checkout being benchmarked."""
+    def git(*cmd):
+        return subprocess.run(["git", *cmd], cwd=str(REPO_DIR), capture_output=True, text=True).stdout.strip()
+    try:
+        return git("rev-parse", "--short", "HEAD") or "unknown", bool(git("status", "--porcelain", "--", "scripts"))
+    except OSError:
+        return "unknown", False
+
+
+def load_results(path: Path) -> list:
+    try:
+        return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def save_result(path: Path, record: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def find_baseline(results: list, record: dict, commit: str = None):
+    """Latest earlier run with the same config, on `commit` or any other commit."""
+    for old in reversed(results):
+        if old["config"] != record["config"]:
+            continue
+        if commit and old["commit"].startswith(commit):
+            return old
+        if not commit and old["commit"] != record["commit"]:
+            return old
+    return None
+
+
+def _fmt(value, unit="s"):
+    if value is None:
+        return "-"
+    if unit == "s":
+        return f"{value * 1000:.0f}ms" if value < 1 else f"{value:.2f}s"
+    return f"{value:g}{unit}"
+
+
+def _delta(new, old):
+    if new is None or not old:
+        return ""
+    return f"  ({(new - old) / old * 100:+.0f}%)"
+
+
+def print_report(record: dict, baseline: dict = None):
+    r = record["result"]
+    b = (baseline or {}).get("result", {})
+    print()
+    print(f"email-editor benchmark -- {record['mode']} mode, commit {record['commit']}"
+          f"{' (dirty)' if record['dirty'] else ''}"
+          + (f", compared with {baseline['commit']} ({baseline['timestamp']})" if baseline else ""))
+    print("=" * 78)
+    print(f"Emails:      {r['emails']} replayed, {r['replies']} replied"
+          f" ({r['error_replies']} error replies){'' if r['complete'] else ' -- TIMED OUT'}")
+    print(f"Throughput:  {r['throughput_per_min']} emails/min over {r['duration_s']:.1f}s"
+          f"{_delta(r['throughput_per_min'], b.get('throughput_per_min'))}")
+    print("End to end:  " + "  ".join(
+        f"{k} {_fmt(v)}{_delta(v, b.get('e2e_s', {}).get(k))}" for k, v in r["e2e_s"].items()))
+    print(f"Peak RSS:    {r['peak_rss_mb']} MB (before loading the editor: {r['baseline_rss_mb']} MB)"
+          f"{_delta(r['peak_rss_mb'], b.get('peak_rss_mb'))}")
+    print(f"AI:          {r['ai_requests']} requests, {r['ai_injected_failures']} injected failures")
+    print()
+    print(f"{'span':<22}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}   p95 vs baseline")
+    print("-" * 78)
+    for name, stats in r["stages_s"].items():
+        old = b.get("stages_s", {}).get(name, {})
+        print(f"{name:<22}{stats['count']:>7}{_fmt(stats['p50']):>10}{_fmt(stats['p95']):>10}"
+              f"{_fmt(stats['p99']):>10}{_delta(stats['p95'], old.get('p95'))}")
+    print()
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def parse_rates(pairs: list) -> dict:
+    """MODEL=VALUE options into a dict."""
+    result = {}
+    for pair in pairs or []:
+        model, _, value = pair.rpartition("=")
+        if not model:
+            raise argparse.ArgumentTypeError(f"expected MODEL=VALUE, got {pair!r}")
+        result[model] = float(value)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("main", "direct"), default="main",
+                        help="main(): IMAP IDLE + worker pool; direct: process_email() per email")
+    parser.add_argument("--corpus", type=Path, help="JSONL of {subject, body} (default: built-in corpus)")
+    parser.add_argument("--emails", type=int, default=DEFAULT_EMAILS, help="built-in corpus size")
+    parser.add_argument("--create-share", type=float, default=0.05, help="share of new-article emails")
+    parser.add_argument("--rate", type=float, default=0, help="emails per minute (0 = one burst)")
+    parser.add_argument("--workers", type=int, default=4, help="EMAIL_EDITOR_WORKERS")
+    parser.add_argument("--deploy-window", type=float, default=2.0, help="DeployCoalescer window, seconds")
+    parser.add_argument("--edit-window", type=float, default=1.0, help="EditCoalescer window, seconds")
+    parser.add_argument("--ai-ttft", type=float, default=0.8, help="median time to first token, seconds")
+    parser.add_argument("--ai-tps", type=float, default=120, help="streamed tokens per second")
+    parser.add_argument("--ai-jitter", type=float, default=0.3, help="lognormal sigma on time to first token")
+    parser.add_argument("--ai-failure-rate", type=float, default=0.0, help="share of requests failing with 502")
+    parser.add_argument("--model-ttft", action="append", metavar="MODEL=SECONDS", help="per-model TTFT")
+    parser.add_argument("--model-failure-rate", action="append", metavar="MODEL=RATE",
+                        help="per-model failure rate")
+    parser.add_argument("--git-latency", type=float, default=0.05, help="seconds per git command")
+    parser.add_argument("--hugo-latency", type=float, default=0.3, help="seconds per incremental rebuild")
+    parser.add_argument("--hugo-cold-latency", type=float, default=3.0, help="seconds per cold build")
+    parser.add_argument("--create-step", type=float, default=2.0, help="seconds per generator step")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--results", type=Path, default=RESULTS_FILE)
+    parser.add_argument("--baseline", metavar="COMMIT", help="compare with this commit's latest run")
+    parser.add_argument("--no-save", action="store_true", help="don't append to the results file")
+    parser.add_argument("--verbose", action="store_true", help="show the editor's INFO logs")
+    args = parser.parse_args()
+
+    commit, dirty = git_revision()
+    rng = random.Random(args.seed)
+    rss_baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tmp = tempfile.mkdtemp(prefix="bench-email-editor-")
+    project = make_workspace(Path(tmp), args)
+    corpus = load_corpus(args.corpus) if args.corpus else \
+        builtin_corpus(project, args.emails, args.create_share, rng)
+
+    mailbox = Mailbox("nico@tourradar.com")
+    imap = serve(_MailServer(_IMAPHandler, mailbox))
+    smtp = serve(_MailServer(_SMTPHandler, mailbox))
+    ai = serve(FakeOpenRouter(args.ai_ttft, args.ai_tps, args.ai_jitter, args.ai_failure_rate,
+                              parse_rates(args.model_ttft), parse_rates(args.model_failure_rate),
+                              args.seed))
+    ee = load_editor(args, ai.url, imap.server_address[1], smtp.server_address[1])
+    mailbox.sender = ee.ALLOWED_SENDER
+
+    print(f"Replaying {len(corpus)} email(s) in {args.mode} mode "
+          f"({'burst' if not args.rate else f'{args.rate:g}/min'}, {args.workers} workers)...")
+    try:
+        complete = (run_main if args.mode == "main" else run_direct)(ee, mailbox, corpus, args)
+    finally:
+        ee.hugo_server.stop()
+
+    config = {k: v for k, v in vars(args).items()
+              if k not in ("results", "baseline", "no_save", "verbose", "timeout", "corpus")}
+    config["corpus"] = str(args.corpus) if args.corpus else "builtin"
+    record = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "mode": args.mode,
+        "config": config,
+        "result": summarize(ee, mailbox, ai, args, complete, rss_baseline),
+    }
+
+    baseline = find_baseline(load_results(args.results), record, args.baseline)
+    print_report(record, baseline)
+    if not args.no_save:
+        save_result(args.results, record)
+        print(f"Saved to {args.results}")
+
+    # Editor threads may still be writing state -- clean up without waiting for them
+    shutil.rmtree(tmp, ignore_errors=True)
+    logging.shutdown()
+    sys.stdout.flush()
+    # Timed-out jobs may still hold worker threads -- don't wait for them
+    os._exit(0 if complete else 1)
+
+
+if __name__ == "__main__":
+    main()
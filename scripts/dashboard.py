@@ -5,13 +5,18 @@ Shows live logs, queue progress, and service health at http://localhost:8080
 """
 
 import json
+import re
 import subprocess
 import threading
 import queue
 import time
+import urllib.request
 from pathlib import Path
 from datetime import datetime
-from flask import Flask, Response, jsonify, render_template_string
+from flask import Flask, Response, jsonify, render_template_string, request
+
+from ai_usage import UsageLog
+from article_index import ArticleIndex
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -20,9 +25,17 @@ from flask import Flask, Response, jsonify, render_template_string
 PORT = 8080
 PROJECT_DIR = Path.home() / "Projects" / "when-to-go"
 QUEUE_FILE = PROJECT_DIR / "data" / "queue.json"
+CONTENT_DIR = PROJECT_DIR / "content" / "countries"
+STATE_DIR = PROJECT_DIR / ".email-editor"
+ROUTER_STATE_FILE = STATE_DIR / "model-router.json"
+CREATES_FILE = STATE_DIR / "creates.json"
+AI_USAGE_FILE = STATE_DIR / "ai-usage.jsonl"
+METRICS_URL = "http://127.0.0.1:9464/metrics"
 SERVICE_NAME = "email-editor"
 
 app = Flask(__name__)
+article_index = ArticleIndex(CONTENT_DIR)
+usage_log = UsageLog(AI_USAGE_FILE)
 
 # ---------------------------------------------------------------------------
 # Helper functions
@@ -103,6 +116,65 @@ def get_recent_commits():
         return []
 
 
+def get_model_router_state():
+    """Read the email editor's persisted model router state."""
+    try:
+        return json.loads(ROUTER_STATE_FILE.read_text())
+    except Exception:
+        return {"order": [], "models": {}}
+
+
+def get_create_jobs():
+    """Read the email editor's article generation progress."""
+    try:
+        return json.loads(CREATES_FILE.read_text())
+    except Exception:
+        return []
+
+
+def fetch_metrics() -> str:
+    """The email editor's Prometheus exposition, or "" if it is not running."""
+    try:
+        with urllib.request.urlopen(METRICS_URL, timeout=2) as resp:
+            return resp.read().decode()
+    except Exception:
+        return ""
+
+
+def get_stage_latency():
+    """Per-span p50/p95 from the email editor's Prometheus endpoint."""
+    stages = {}
+    for line in fetch_metrics().splitlines():
+        match = re.match(r'email_editor_span_recent_seconds\{span="([^"]+)",quantile="([\d.]+)"\} (\S+)', line)
+        if match:
+            key = {"0.5": "p50", "0.95": "p95", "0.99": "p99"}.get(match.group(2))
+            if key:
+                stages.setdefault(match.group(1), {})[key] = float(match.group(3))
+            continue
+        match = re.match(r'email_editor_span_seconds_count\{span="([^"]+)"\} (\S+)', line)
+        if match:
+            stages.setdefault(match.group(1), {})["count"] = int(float(match.group(2)))
+    return stages
+
+
+def get_lanes():
+    """Per-lane queue depth, running jobs, limits and wait times of the editor's scheduler."""
+    text = fetch_metrics()
+    lanes = {}
+    for match in re.finditer(r'^email_editor_lane_(queue_depth|running|workers|target_seconds)\{lane="([^"]+)"\} (\S+)$',
+                             text, re.MULTILINE):
+        key = {"queue_depth": "queued", "target_seconds": "target"}.get(match.group(1), match.group(1))
+        value = float(match.group(3))
+        lanes.setdefault(match.group(2), {})[key] = value if key == "target" else int(value)
+    for match in re.finditer(r'^email_editor_lane_target_missed_total\{lane="([^"]+)"\} (\S+)$', text, re.MULTILINE):
+        lanes.setdefault(match.group(1), {})["missed"] = int(float(match.group(2)))
+    stages = get_stage_latency() if lanes else {}
+    for name, lane in lanes.items():
+        wait = stages.get(f"lane.{name}.wait", {})
+        lane["wait_p50"], lane["wait_p95"] = wait.get("p50"), wait.get("p95")
+    return lanes
+
+
 # ---------------------------------------------------------------------------
 # SSE log streaming
 # ---------------------------------------------------------------------------
@@ -167,6 +239,43 @@ def api_queue():
     return jsonify(get_queue_stats())
 
 
+@app.route("/api/articles")
+def api_articles():
+    """JSON endpoint -- per-article frontmatter summary from the article index."""
+    return jsonify(article_index.summary())
+
+
+@app.route("/api/creates")
+def api_creates():
+    """JSON endpoint -- running and recent article generations with step progress."""
+    return jsonify(get_create_jobs())
+
+
+@app.route("/api/models")
+def api_models():
+    """JSON endpoint -- model routing order, circuit breakers and latency stats."""
+    return jsonify(get_model_router_state())
+
+
+@app.route("/api/stages")
+def api_stages():
+    """JSON endpoint -- p50/p95 latency per pipeline stage and I/O span."""
+    return jsonify(get_stage_latency())
+
+
+@app.route("/api/usage")
+def api_usage():
+    """JSON endpoint -- AI tokens and cost by day, model and action (?days=30)."""
+    days = min(max(request.args.get("days", 30, type=int), 1), 365)
+    return jsonify(usage_log.rollup(days))
+
+
+@app.route("/api/lanes")
+def api_lanes():
+    """JSON endpoint -- queue depth and wait times per priority lane."""
+    return jsonify(get_lanes())
+
+
 @app.route("/")
 def index():
     """Serve the dashboard page with all HTML/CSS/JS inline."""
@@ -236,7 +345,7 @@ DASHBOARD_HTML = r"""
   .grid {
     display: grid;
     grid-template-columns: 1fr 380px;
-    grid-template-rows: auto 1fr;
+    grid-template-rows: auto auto 1fr;
     gap: 16px;
     padding: 16px 24px;
     height: calc(100vh - 65px);
@@ -260,7 +369,7 @@ DASHBOARD_HTML = r"""
   }
 
   /* -- Log panel -- */
-  .log-panel { grid-column: 1; grid-row: 1 / 3; display: flex; flex-direction: column; }
+  .log-panel { grid-column: 1; grid-row: 1 / 4; display: flex; flex-direction: column; }
   .log-panel .card-header { display: flex; justify-content: space-between; align-items: center; }
 
   #log-container {
@@ -342,8 +451,30 @@ DASHBOARD_HTML = r"""
   .total-bar .tier-label .name { color: #8b949e; }
   .total-bar .progress-fill { background: linear-gradient(90deg, #da3633, #f78166, #3fb950); }
 
+  /* -- Stage latency panel -- */
+  .stage-panel { grid-column: 2; grid-row: 2; }
+  .stage-list { max-height: 260px; overflow-y: auto; padding: 6px 0; }
+
+  .stage-row {
+    display: grid;
+    grid-template-columns: 110px 1fr 90px;
+    gap: 8px;
+    align-items: center;
+    padding: 4px 16px;
+    font-size: 12px;
+  }
+  .stage-row .name { color: #e6edf3; font-family: 'JetBrains Mono', monospace; }
+  .stage-row .value { color: #8b949e; text-align: right; }
+  .stage-bar { position: relative; height: 8px; background: #21262d; border-radius: 4px; overflow: hidden; }
+  .stage-bar .p95 { position: absolute; height: 100%; background: #1f6feb55; border-radius: 4px; }
+  .stage-bar .p50 { position: absolute; height: 100%; background: #58a6ff; border-radius: 4px; }
+  .lane-list { padding: 6px 16px 0; font-size: 12px; color: #8b949e; }
+  .lane-list .lane { display: flex; justify-content: space-between; padding: 2px 0; }
+  .lane-list .lane .name { color: #e6edf3; font-family: 'JetBrains Mono', monospace; }
+  .lane-list .lane.late .value { color: #d29922; }
+
   /* -- Activity panel -- */
-  .activity-panel { grid-column: 2; grid-row: 2; display: flex; flex-direction: column; }
+  .activity-panel { grid-column: 2; grid-row: 3; display: flex; flex-direction: column; }
 
   .commit-list { flex: 1; overflow-y: auto; }
 
@@ -417,6 +548,13 @@ DASHBOARD_HTML = r"""
     <div class="total-bar" id="total-bar"></div>
   </div>
 
+  <!-- Stage Latency -->
+  <div class="card stage-panel">
+    <div class="card-header">Stage Latency (p50 / p95)</div>
+    <div class="lane-list" id="lane-list"></div>
+    <div class="stage-list" id="stage-list"></div>
+  </div>
+
   <!-- Recent Activity -->
   <div class="card activity-panel">
     <div class="card-header">Recent Activity</div>
@@ -546,10 +684,69 @@ DASHBOARD_HTML = r"""
       </div>`).join('');
   }
 
+  // -- Stage latency bars (log scale so 50ms IMAP and 60s edits share an axis) --
+  function formatSeconds(s) {
+    return s < 1 ? Math.round(s * 1000) + 'ms' : s.toFixed(1) + 's';
+  }
+
+  async function refreshStages() {
+    const container = document.getElementById('stage-list');
+    try {
+      const res = await fetch('/api/stages');
+      const stages = await res.json();
+      const names = Object.keys(stages).filter(n => stages[n].p50 != null).sort();
+      if (names.length === 0) {
+        container.innerHTML = '<div style="padding:10px 16px;color:#484f58">No timings yet</div>';
+        return;
+      }
+      const max = Math.max(...names.map(n => stages[n].p95));
+      const scale = v => Math.max(2, 100 * Math.log1p(v * 10) / Math.log1p(max * 10));
+      container.innerHTML = names.map(n => {
+        const s = stages[n];
+        return `
+        <div class="stage-row" title="${s.count || 0} samples">
+          <span class="name">${n}</span>
+          <div class="stage-bar">
+            <div class="p95" style="width: ${scale(s.p95)}%"></div>
+            <div class="p50" style="width: ${scale(s.p50)}%"></div>
+          </div>
+          <span class="value">${formatSeconds(s.p50)} / ${formatSeconds(s.p95)}</span>
+        </div>`;
+      }).join('');
+    } catch (e) {
+      console.error('Stage fetch failed:', e);
+    }
+  }
+
+  // -- Priority lanes: running/limit, queue depth, wait p95 against the target --
+  async function refreshLanes() {
+    const container = document.getElementById('lane-list');
+    try {
+      const res = await fetch('/api/lanes');
+      const lanes = await res.json();
+      container.innerHTML = Object.keys(lanes).map(n => {
+        const l = lanes[n];
+        const late = l.wait_p95 != null && l.wait_p95 > l.target;
+        const wait = l.wait_p95 != null ? formatSeconds(l.wait_p95) : '-';
+        return `
+        <div class="lane${late ? ' late' : ''}" title="${l.missed || 0} started past target">
+          <span class="name">${n}</span>
+          <span class="value">${l.running}/${l.workers} running &middot; ${l.queued} queued &middot; wait p95 ${wait} (target ${formatSeconds(l.target)})</span>
+        </div>`;
+      }).join('');
+    } catch (e) {
+      console.error('Lane fetch failed:', e);
+    }
+  }
+
   // Start everything
   startLogStream();
   refreshStatus();
+  refreshStages();
+  refreshLanes();
   setInterval(refreshStatus, 5000);
+  setInterval(refreshStages, 5000);
+  setInterval(refreshLanes, 5000);
 </script>
 
 </body>
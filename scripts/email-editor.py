@@ -6,21 +6,41 @@ Monitors i-am-a-user@nichtagentur.at for emails from nico@tourradar.com,
 uses AI to interpret edit instructions, updates articles, deploys, and replies.
 """
 
+import atexit
 import imaplib
 import smtplib
 import email
+import base64
+import fcntl
+import hashlib
+import http.client
+import quopri
+import socket
+import sqlite3
 import json
 import os
 import re
+import select
+import signal
 import subprocess
 import sys
 import time
 import logging
+import queue
+import threading
+import urllib.parse
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.header import decode_header
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from datetime import datetime
 
+from ai_usage import UsageLog
+from article_index import ArticleIndex
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -37,23 +57,116 @@ ALLOWED_SENDER = "nico@tourradar.com"
 PROJECT_DIR = Path.home() / "Projects" / "when-to-go"
 CONTENT_DIR = PROJECT_DIR / "content" / "countries"
 QUEUE_FILE = PROJECT_DIR / "data" / "queue.json"
-
-POLL_INTERVAL = 30          # seconds between IMAP checks
+COUNTRIES_FILE = PROJECT_DIR / "data" / "countries.json"
+STATE_DIR = PROJECT_DIR / ".email-editor"   # local runtime state (gitignored)
+SYNC_STATE_FILE = STATE_DIR / "mailbox-sync.json"
+AI_CACHE_FILE = STATE_DIR / "ai-cache.db"
+ROUTER_STATE_FILE = STATE_DIR / "model-router.json"
+AI_USAGE_FILE = STATE_DIR / "ai-usage.jsonl"   # per-call tokens and cost (see ai_usage.py)
+OUTBOX_DIR = STATE_DIR / "outbox"
+JOBS_DB_FILE = STATE_DIR / "jobs.db"
+CREATES_FILE = STATE_DIR / "creates.json"
+DEPLOY_LOCK_FILE = STATE_DIR / "deploy.lock"
+DEPLOY_WORKTREE = STATE_DIR / "deploy-tree"   # scratch checkout deploys rebase in
+JUNK_FOLDER = "Junk"
+
+POLL_INTERVAL = 30          # seconds between IMAP checks (servers without IDLE)
+# IDLE is ended for a Junk STATUS check this often, which also keeps it well
+# under the 29 min server cutoff (RFC 2177)
+JUNK_CHECK_INTERVAL = 60    # seconds between Junk STATUS checks while idling
+MAX_BODY_BYTES = 64 * 1024  # cap on the text/plain section downloaded per email
 MAX_CONSECUTIVE_FAILS = 5   # before increasing backoff
 BACKOFF_INTERVAL = 60       # seconds after too many failures
 
+SMTP_TIMEOUT = 30           # seconds per SMTP connect / command
+SMTP_IDLE_TIMEOUT = 60      # close the reused SMTP session after this long unused
+OUTBOX_RETRY_BASE = 30      # seconds before the first retry of a failed reply (doubles)
+OUTBOX_MAX_BACKOFF = 30 * 60
+OUTBOX_MAX_ATTEMPTS = 10    # then the reply is moved to outbox/failed
+
+WORKER_POOL_SIZE = int(os.environ.get("EMAIL_EDITOR_WORKERS", "4"))
+THROUGHPUT_LOG_INTERVAL = 300   # seconds between emails/minute reports
+METRICS_PORT = int(os.environ.get("EMAIL_EDITOR_METRICS_PORT", "9464"))  # Prometheus /metrics on localhost
+METRICS_WINDOW = 500            # recent samples per span used for p50/p95
+DEPLOY_WINDOW = 10              # seconds to gather finished edits into one deploy
+DEPLOY_MAX_BATCH = 20           # deploy right away once this many edits are waiting
+EDIT_WINDOW = 5                 # seconds to gather instructions for one article into one edit
+EDIT_MAX_BATCH = 6              # edit right away once this many instructions are waiting
+JOB_MAX_ATTEMPTS = 3            # processing attempts per email before giving up
+JOB_RETRY_DELAY = 60            # seconds before re-running a failed job (doubles)
+# Several editor processes may share STATE_DIR (one host, or several on a shared
+# checkout): jobs and articles are held under expiring leases in jobs.db
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}"
+LEASE_TTL = 90                  # seconds a job / article lease lasts without renewal
+LEASE_RENEW_INTERVAL = 20       # seconds between lease renewals (heartbeat)
+LEASE_POLL_INTERVAL = 1.0       # seconds between attempts to take a busy article lease
+BATCH_WORKERS = 1               # article generations and bulk edits, off the interactive workers
+# Priority lanes: quick single-article work is interactive, long jobs are batch.
+# Each lane has its own worker limit and a target for how long a job may wait
+# to start; interactive jobs always start ahead of queued batch jobs.
+LANES = {
+    "interactive": {"workers": WORKER_POOL_SIZE, "target": 30},
+    "batch": {"workers": BATCH_WORKERS, "target": 15 * 60},
+}
+# Timeout per generate-article.js step (seconds without reaching the next step)
+CREATE_STEP_TIMEOUTS = {
+    "starting": 60,
+    "content": 300,
+    "hero image": 180,
+    "climate chart": 180,
+    "markdown": 60,
+    "markdown written": 60,
+    "finishing": 30,
+}
+GENERATOR_STEPS = {"1": "content", "2": "hero image", "3": "climate chart", "4": "markdown"}
+BULK_CONCURRENCY = 4            # articles edited in parallel by one bulk request
+BULK_EDITS_PER_MINUTE = 30      # rate limit on bulk article edits (AI calls)
+BULK_RETRIES = 2                # extra attempts per article in a bulk request
+BULK_RETRY_DELAY = 10           # seconds before a bulk retry (times the attempt number)
+
 SITE_URL = "https://nichtagentur.github.io/when-to-go"
 
+HUGO_SERVER_PORT = 1314         # local warm `hugo server` used for build checks
+HUGO_START_TIMEOUT = 120        # seconds to wait for its initial build
+HUGO_CHECK_TIMEOUT = 15         # seconds to wait for it to rebuild changed files
+HUGO_ERROR_SETTLE = 0.5         # quiet time after an error line before a failed rebuild counts as done
+HUGO_RESTART_DELAY = 30         # seconds before restarting a crashed hugo server
+HUGO_FULL_BUILD_INTERVAL = 6 * 3600   # run a cold `hugo --minify` at least this often
+
 # OpenRouter API for AI calls
 OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY", "")
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+HTTP_POOL_SIZE = 8              # max concurrent (and idle keep-alive) connections to OpenRouter
+HTTP_CONNECT_TIMEOUT = 10       # seconds to establish TCP + TLS
+HTTP_READ_TIMEOUT = 120         # seconds to wait on a response read
 
-# Model fallback chain (same as the JS blog pipeline)
+AI_CACHE_MAX_ENTRIES = 500      # LRU bound across classifications and edits
+AI_CACHE_TTL = 7 * 24 * 3600    # seconds before a cached AI result expires
+
+HEDGE_PERCENTILE = 0.9          # fire the next model once the current one passes this latency percentile
+HEDGE_DEFAULT_DELAY = 20        # seconds, until a model has enough latency samples
+HEDGE_MIN_DELAY = 2             # never hedge sooner than this
+LATENCY_SAMPLES = 50            # recent latencies kept per model
+PREFIX_CHECK_CHARS = 40         # streamed chars to collect before checking the reply's opening
+
+# Model fallback chain (same as the JS blog pipeline); ModelRouter reorders it
 MODELS = [
     "google/gemini-2.0-flash-001",   # cheapest
     "deepseek/deepseek-chat",
     "openai/gpt-4o-mini",
 ]
 
+# USD per 1M (input, output) tokens, as listed on OpenRouter
+MODEL_PRICING = {
+    "google/gemini-2.0-flash-001": (0.10, 0.40),
+    "deepseek/deepseek-chat": (0.38, 0.89),
+    "openai/gpt-4o-mini": (0.15, 0.60),
+}
+
+CIRCUIT_FAILURE_THRESHOLD = 3   # consecutive failures before a model's circuit opens
+CIRCUIT_COOLDOWN = 300          # seconds before an open circuit goes half-open
+ROUTER_COST_WEIGHT = 5          # seconds of expected latency worth $1/M tokens
+
 # ---------------------------------------------------------------------------
 # Logging
 # ---------------------------------------------------------------------------
@@ -67,58 +180,684 @@ logging.basicConfig(
 log = logging.getLogger("email-editor")
 
 # ---------------------------------------------------------------------------
-# AI helpers (OpenRouter with 3-model fallback)
+# Metrics (timing spans and counters, served in Prometheus text format)
 # ---------------------------------------------------------------------------
 
-def call_ai(system_prompt: str, user_prompt: str, max_tokens: int = 4000) -> str:
-    """Call OpenRouter with the 3-model fallback chain. Returns response text."""
-    import urllib.request
+class Metrics:
+    """In-process timing histograms and counters.
 
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
+    span(name) times a block into a histogram with fixed buckets (plus a
+    window of recent samples for p50/p95) and counts the ones that raised;
+    inc() bumps a labelled counter and gauge() sets a labelled level.
+    render() produces the Prometheus text exposition served on METRICS_PORT.
+    """
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, float("inf"))
+    QUANTILES = (0.5, 0.95, 0.99)
 
-    last_error = None
-    for model in MODELS:
+    def __init__(self):
+        self._spans = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.monotonic()
         try:
-            payload = json.dumps({
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                "max_tokens": max_tokens,
-                "temperature": 0.4,
-            }).encode()
-
-            req = urllib.request.Request(
-                "https://openrouter.ai/api/v1/chat/completions",
-                data=payload,
-                headers=headers,
-                method="POST",
-            )
-            with urllib.request.urlopen(req, timeout=120) as resp:
-                data = json.loads(resp.read().decode())
+            yield
+        except Exception:
+            self.inc("span_errors_total", span=name)
+            raise
+        finally:
+            self.observe(name, time.monotonic() - started)
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            span = self._spans.get(name)
+            if span is None:
+                span = self._spans[name] = {
+                    "buckets": [0] * len(self.BUCKETS), "sum": 0.0, "count": 0,
+                    "recent": deque(maxlen=METRICS_WINDOW),
+                }
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    span["buckets"][i] += 1
+            span["sum"] += seconds
+            span["count"] += 1
+            span["recent"].append(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def quantiles(self) -> dict:
+        """{span: {"p50": s, "p95": s, "p99": s, "count": n}} over the recent window."""
+        with self._lock:
+            return {
+                name: {
+                    "p50": _percentile(span["recent"], 0.5),
+                    "p95": _percentile(span["recent"], 0.95),
+                    "p99": _percentile(span["recent"], 0.99),
+                    "count": span["count"],
+                }
+                for name, span in self._spans.items()
+            }
+
+    def gauge(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def counters(self) -> dict:
+        """{'name{label="value",...}': count} for every counter."""
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            name + ("{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""): value
+            for (name, pairs), value in sorted(counters.items())
+        }
+
+    def render(self) -> str:
+        def labels(pairs):
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+
+        lines = [
+            "# HELP email_editor_span_seconds Time spent in each instrumented span.",
+            "# TYPE email_editor_span_seconds histogram",
+        ]
+        with self._lock:
+            spans = {name: {**span, "recent": list(span["recent"])} for name, span in self._spans.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        for name, span in sorted(spans.items()):
+            for bound, count in zip(self.BUCKETS, span["buckets"]):
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'email_editor_span_seconds_bucket{{span="{name}",le="{le}"}} {count}')
+            lines.append(f'email_editor_span_seconds_sum{{span="{name}"}} {span["sum"]:.6f}')
+            lines.append(f'email_editor_span_seconds_count{{span="{name}"}} {span["count"]}')
+
+        lines += [
+            f"# HELP email_editor_span_recent_seconds Span latency over the last {METRICS_WINDOW} samples.",
+            "# TYPE email_editor_span_recent_seconds summary",
+        ]
+        for name, span in sorted(spans.items()):
+            for q in self.QUANTILES:
+                lines.append(f'email_editor_span_recent_seconds{{span="{name}",quantile="{q}"}} '
+                             f'{_percentile(span["recent"], q):.6f}')
+            lines.append(f'email_editor_span_recent_seconds_sum{{span="{name}"}} {sum(span["recent"]):.6f}')
+            lines.append(f'email_editor_span_recent_seconds_count{{span="{name}"}} {len(span["recent"])}')
+
+        for family in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE email_editor_{family} counter")
+            for (name, pairs), value in sorted(counters.items()):
+                if name == family:
+                    lines.append(f"email_editor_{name}{labels(pairs)} {value:g}")
+        for family in sorted({name for name, _ in gauges}):
+            lines.append(f"# TYPE email_editor_{family} gauge")
+            for (name, pairs), value in sorted(gauges.items()):
+                if name == family:
+                    lines.append(f"email_editor_{name}{labels(pairs)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
-            content = data["choices"][0]["message"]["content"].strip()
-            if len(content) < 50:
-                raise ValueError(f"Response too short ({len(content)} chars)")
+    def log_message(self, format, *args):
+        pass
 
-            log.info(f"AI call succeeded with {model}")
-            return content
 
-        except Exception as e:
-            last_error = e
-            log.warning(f"Model {model} failed: {e}")
-            continue
+def start_metrics_server(port: int = METRICS_PORT):
+    """Serve /metrics on localhost in a background thread."""
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    except OSError as e:
+        log.warning(f"Metrics endpoint not started on port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    log.info(f"  Metrics: http://127.0.0.1:{server.server_address[1]}/metrics")
+    return server
+
+# ---------------------------------------------------------------------------
+# AI helpers (OpenRouter with hedged 3-model fallback)
+# ---------------------------------------------------------------------------
+
+class HTTPPool:
+    """Bounded pool of keep-alive HTTP(S) connections to one host.
+
+    At most `size` connections exist at once (acquire() blocks beyond
+    that); idle ones are reused most-recently-released first so the TLS
+    session stays warm. Connect and read timeouts are set separately.
+    """
+
+    def __init__(self, url: str, size: int = HTTP_POOL_SIZE,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = HTTP_READ_TIMEOUT):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.netloc
+        self.path = parts.path
+        self._conn_class = (http.client.HTTPSConnection if parts.scheme == "https"
+                            else http.client.HTTPConnection)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """Return (connection, reused). Pair every acquire with a release."""
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        try:
+            conn = self._conn_class(self.host, timeout=self.connect_timeout)
+            conn.connect()
+            conn.sock.settimeout(self.read_timeout)
+        except Exception:
+            self._slots.release()
+            raise
+        return conn, False
+
+    def release(self, conn, reusable: bool):
+        """Return a connection to the pool, or close it if it can't be reused."""
+        if reusable:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
 
-    raise RuntimeError(f"All AI models failed. Last error: {last_error}")
 
+_openrouter_pool = None
+_openrouter_pool_lock = threading.Lock()
 
-def call_ai_json(system_prompt: str, user_prompt: str) -> dict:
-    """Call AI and parse the response as JSON."""
-    raw = call_ai(system_prompt, user_prompt, max_tokens=500)
+
+def openrouter_pool() -> HTTPPool:
+    """Shared connection pool for every OpenRouter call (classify and edit)."""
+    global _openrouter_pool
+    with _openrouter_pool_lock:
+        if _openrouter_pool is None:
+            _openrouter_pool = HTTPPool(OPENROUTER_URL)
+        return _openrouter_pool
+
+
+def _percentile(samples, fraction: float):
+    """Nearest-rank percentile of a sample list, or None if empty."""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ModelRouter:
+    """Per-model health tracking, circuit breakers and adaptive ordering.
+
+    Keeps rolling latency / TTFT / throughput samples, recent outcomes and
+    error types for every model. After CIRCUIT_FAILURE_THRESHOLD failures
+    in a row a model's breaker opens and it is skipped; after
+    CIRCUIT_COOLDOWN seconds it goes half-open and gets one more chance.
+    order() ranks usable models by expected latency (p50 / success rate)
+    plus a cost term. State is persisted to ROUTER_STATE_FILE after every
+    update, which is also what the dashboard serves.
+    """
+
+    def __init__(self, models: list = MODELS, path: Path = ROUTER_STATE_FILE):
+        self.models = list(models)
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = {model: self._empty() for model in self.models}
+        self._load()
+
+    @staticmethod
+    def _empty() -> dict:
+        return {
+            "latency": [], "ttft": [], "tps": [], "outcomes": [], "errors": [],
+            "breaker": "closed", "opened_at": None, "consecutive_failures": 0,
+        }
+
+    def _load(self):
+        try:
+            saved = json.loads(self.path.read_text()).get("models", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        for model, state in saved.items():
+            if model in self._state:
+                self._state[model].update({k: v for k, v in state.items() if k in self._state[model]})
+
+    def _save(self):
+        snapshot = {"updated": datetime.utcnow().isoformat() + "Z", "order": self.order(), "models": {}}
+        for model in self.models:
+            snapshot["models"][model] = {**self._state[model], **self._summary(model)}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(snapshot, indent=2))
+        tmp.replace(self.path)
+
+    def _summary(self, model: str) -> dict:
+        state = self._state[model]
+        outcomes = [ok for _, ok in state["outcomes"]]
+        return {
+            "success_rate": sum(outcomes) / len(outcomes) if outcomes else None,
+            "p50": _percentile(state["latency"], 0.5),
+            "p95": _percentile(state["latency"], 0.95),
+            "ttft_p50": _percentile(state["ttft"], 0.5),
+            "tps_p50": _percentile(state["tps"], 0.5),
+        }
+
+    def _refresh_breaker(self, model: str):
+        state = self._state[model]
+        if state["breaker"] == "open" and time.time() - state["opened_at"] >= CIRCUIT_COOLDOWN:
+            state["breaker"] = "half_open"
+            log.info(f"Circuit half-open for {model} -- allowing a trial request")
+
+    def _score(self, model: str) -> float:
+        summary = self._summary(model)
+        p50 = summary["p50"] if summary["p50"] is not None else HEDGE_DEFAULT_DELAY
+        success = summary["success_rate"] if summary["success_rate"] is not None else 1.0
+        input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+        return p50 / max(success, 0.1) + ROUTER_COST_WEIGHT * (input_price + output_price) / 2
+
+    def order(self) -> list:
+        """Models to try, best first. Open circuits go last, never dropped."""
+        for model in self.models:
+            self._refresh_breaker(model)
+        usable = [m for m in self.models if self._state[m]["breaker"] != "open"]
+        tripped = [m for m in self.models if self._state[m]["breaker"] == "open"]
+        usable.sort(key=self._score)
+        tripped.sort(key=lambda m: self._state[m]["opened_at"])
+        return usable + tripped
+
+    def routing(self) -> list:
+        with self._lock:
+            return self.order()
+
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to give `model` before also firing the next one.
+
+        The HEDGE_PERCENTILE of its recent latencies, or HEDGE_DEFAULT_DELAY
+        until there are enough samples.
+        """
+        with self._lock:
+            samples = self._state[model]["latency"]
+            if len(samples) < 5:
+                return HEDGE_DEFAULT_DELAY
+            return max(HEDGE_MIN_DELAY, _percentile(samples, HEDGE_PERCENTILE))
+
+    def record_success(self, model: str, latency: float, ttft: float, tokens_per_sec: float):
+        with self._lock:
+            state = self._state[model]
+            for key, value in (("latency", latency), ("ttft", ttft), ("tps", tokens_per_sec)):
+                state[key] = (state[key] + [round(value, 3)])[-LATENCY_SAMPLES:]
+            state["outcomes"] = (state["outcomes"] + [[time.time(), True]])[-LATENCY_SAMPLES:]
+            state["consecutive_failures"] = 0
+            if state["breaker"] != "closed":
+                log.info(f"Circuit closed for {model}")
+            state["breaker"] = "closed"
+            state["opened_at"] = None
+            self._save()
+
+    def record_failure(self, model: str, error: Exception):
+        with self._lock:
+            state = self._state[model]
+            match = re.match(r"HTTP (\d+)", str(error))
+            kind = f"HTTP {match.group(1)}" if match else type(error).__name__
+            state["outcomes"] = (state["outcomes"] + [[time.time(), False]])[-LATENCY_SAMPLES:]
+            state["errors"] = (state["errors"] + [[time.time(), kind, str(error)[:200]]])[-10:]
+            state["consecutive_failures"] += 1
+            if (state["breaker"] == "half_open"
+                    or state["consecutive_failures"] >= CIRCUIT_FAILURE_THRESHOLD):
+                if state["breaker"] != "open":
+                    log.warning(f"Circuit opened for {model} after "
+                                f"{state['consecutive_failures']} failure(s) ({kind})")
+                state["breaker"] = "open"
+                state["opened_at"] = time.time()
+            self._save()
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def model_router() -> ModelRouter:
+    """Process-wide ModelRouter, loaded from disk on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
+
+
+REFUSAL_PATTERN = re.compile(
+    r"^(I'm sorry|I am sorry|Sorry|I can't|I cannot|I'm unable|I am unable|As an AI)\b",
+    re.IGNORECASE,
+)
+
+
+def check_prefix(text: str, expect: str = None):
+    """Reject a reply from its opening characters. Raises ValueError.
+
+    Every reply is checked for refusals; `expect` adds a structural check:
+    "article" (must open with --- frontmatter, no code fence), "blocks"
+    (must open with a <<<BLOCK marker) or "json" (object or fenced JSON).
+    """
+    if REFUSAL_PATTERN.match(text):
+        raise ValueError(f"Refusal: {text[:60]!r}")
+    if expect == "article" and not text.startswith("---"):
+        raise ValueError(f"Reply doesn't open with frontmatter: {text[:30]!r}")
+    if expect == "blocks" and not text.startswith("<<<BLOCK"):
+        raise ValueError(f"Reply doesn't open with a block marker: {text[:30]!r}")
+    if expect == "json" and not text.startswith(("{", "```")):
+        raise ValueError(f"Reply doesn't open with JSON: {text[:30]!r}")
+
+
+class ModelAttempt:
+    """One streamed request to one model. cancel() aborts it from another thread.
+
+    The reply's opening is checked with check_prefix() as soon as
+    PREFIX_CHECK_CHARS have arrived, so a bad reply is dropped without
+    waiting for the rest of the generation.
+    """
+
+    def __init__(self, model: str, payload: dict, expect: str = None):
+        self.model = model
+        self.payload = payload
+        self.expect = expect
+        self.started = time.monotonic()
+        self.ttft = None
+        self.chunks = 0
+        self.usage = None
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    def run(self) -> str:
+        pool = openrouter_pool()
+        body = json.dumps({"model": self.model, "stream": True, **self.payload}).encode()
+        headers = {
+            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+        }
+        while True:
+            conn, reused = pool.acquire()
+            with self._conn_lock:
+                self._conn = conn
+            try:
+                if self._cancelled.is_set():
+                    raise RuntimeError("cancelled")
+                conn.request("POST", pool.path, body=body, headers=headers)
+                resp = conn.getresponse()
+            except (ConnectionResetError, BrokenPipeError, http.client.BadStatusLine):
+                self._detach()
+                pool.release(conn, reusable=False)
+                if reused and not self._cancelled.is_set():
+                    continue  # idle keep-alive connection was closed by the server
+                raise
+            except BaseException:
+                self._detach()
+                pool.release(conn, reusable=False)
+                raise
+            break
+
+        try:
+            if resp.status != 200:
+                raise RuntimeError(f"HTTP {resp.status}: {resp.read()[:200].decode(errors='replace')}")
+            text = self._read_stream(resp)
+            resp.read()  # drain the chunked body so the connection can be reused
+        except BaseException:
+            self._detach()
+            pool.release(conn, reusable=False)
+            raise
+        # Detach first so a late cancel() can't hit a pooled connection
+        self._detach()
+        pool.release(conn, reusable=not resp.will_close)
+        return text.strip()
+
+    def _read_stream(self, resp) -> str:
+        """Collect the content deltas of an SSE completion stream."""
+        parts = []
+        checked = False
+        while True:
+            line = resp.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line.startswith(b"data:"):
+                continue  # blank separators and ": OPENROUTER PROCESSING" comments
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                break
+            chunk = json.loads(data)
+            if "error" in chunk:
+                raise RuntimeError(f"Stream error: {chunk['error']}")
+            if chunk.get("usage"):
+                self.usage = chunk["usage"]
+            delta = ((chunk.get("choices") or [{}])[0].get("delta") or {}).get("content")
+            if not delta:
+                continue
+            if self.ttft is None:
+                self.ttft = time.monotonic() - self.started
+            self.chunks += 1
+            parts.append(delta)
+            if not checked:
+                opening = "".join(parts).lstrip()
+                if len(opening) >= PREFIX_CHECK_CHARS:
+                    check_prefix(opening, self.expect)
+                    checked = True
+        text = "".join(parts)
+        if not checked:
+            check_prefix(text.lstrip(), self.expect)
+        return text
+
+    def tokens_per_sec(self) -> float:
+        """Completion tokens per second after the first token arrived."""
+        tokens = (self.usage or {}).get("completion_tokens") or self.chunks
+        generating = time.monotonic() - self.started - (self.ttft or 0)
+        return tokens / generating if generating > 0 else 0.0
+
+    def _detach(self):
+        with self._conn_lock:
+            self._conn = None
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._conn_lock:
+            sock = self._conn.sock if self._conn else None
+            if sock:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+usage_log = UsageLog(AI_USAGE_FILE)
+_ai_context = threading.local()
+
+
+@contextmanager
+def ai_context(**fields):
+    """Tag the AI calls made in this block, on this thread (email=, action=)."""
+    previous = current_ai_context()
+    _ai_context.fields = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _ai_context.fields = previous
+
+
+def current_ai_context() -> dict:
+    return getattr(_ai_context, "fields", {})
+
+
+def record_ai_usage(model: str, outcome: str, prompt_tokens: int, completion_tokens: int,
+                    secs: float, cost: float = None, estimated: bool = False):
+    """Log one model request to usage_log and the token/cost counters.
+
+    `cost` is OpenRouter's reported USD cost; without it the cost is
+    estimated from MODEL_PRICING.
+    """
+    if cost is None:
+        input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    metrics.inc("ai_tokens_total", prompt_tokens, model=model, kind="prompt")
+    metrics.inc("ai_tokens_total", completion_tokens, model=model, kind="completion")
+    metrics.inc("ai_cost_usd_total", cost, model=model)
+    record = {"action": "other", **current_ai_context(), "model": model, "outcome": outcome,
+              "in": prompt_tokens, "out": completion_tokens, "secs": round(secs, 2), "usd": round(cost, 6)}
+    if estimated:
+        record["est"] = 1
+    try:
+        usage_log.record(**record)
+    except OSError as e:
+        log.warning(f"Could not write AI usage record: {e}")
+
+
+def _record_attempt(attempt: ModelAttempt, outcome: str, secs: float, prompt_chars: int):
+    usage = attempt.usage or {}
+    if not usage and attempt.ttft is None:
+        # Rejected upstream (HTTP error, no connection) or cancelled before
+        # generating anything: OpenRouter doesn't bill these
+        record_ai_usage(attempt.model, outcome, 0, 0, secs, cost=0.0)
+        return
+    estimated = not usage.get("prompt_tokens")
+    record_ai_usage(
+        attempt.model, outcome,
+        usage.get("prompt_tokens") or prompt_chars // 4,
+        usage.get("completion_tokens") or attempt.chunks,
+        secs, cost=usage.get("cost"), estimated=estimated,
+    )
+
+
+def _check_min_length(content: str):
+    if len(content) < 50:
+        raise ValueError(f"Response too short ({len(content)} chars)")
+
+
+def call_ai(system_prompt: str, user_prompt: str, max_tokens: int = 4000,
+            validate=None, expect: str = None) -> str:
+    """Call OpenRouter with hedged requests down the model chain.
+
+    Models are tried in ModelRouter order (open circuits last). If the
+    current model hasn't answered within its hedge delay, the next one is
+    fired in parallel; a failure fires the next one immediately. The first
+    answer that passes `validate` (default: at least 50 chars; raise
+    ValueError to reject) wins and the other requests are cancelled.
+    Replies are streamed, and one whose opening fails check_prefix(...,
+    expect) is abandoned mid-stream. Returns the response text.
+
+    Raises RuntimeError if every model failed, or ValueError if every model
+    answered but no answer was usable.
+    """
+    validate = validate or _check_min_length
+    payload = {
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        "max_tokens": max_tokens,
+        "temperature": 0.4,
+        "usage": {"include": True},   # token counts and cost in the final chunk
+    }
+    prompt_chars = len(system_prompt) + len(user_prompt)
+
+    router = model_router()
+    pending = router.routing()
+    attempts = []
+    results = queue.Queue()
+    call_started = time.monotonic()
+
+    def launch():
+        attempt = ModelAttempt(pending.pop(0), payload, expect)
+        attempts.append(attempt)
+
+        def run():
+            try:
+                results.put((attempt, attempt.run(), None))
+            except Exception as e:
+                results.put((attempt, None, e))
+
+        threading.Thread(target=run, name=f"ai-{attempt.model}", daemon=True).start()
+
+    settled = {}    # attempt -> (outcome, seconds); attempts missing here were cancelled
+    try:
+        launch()
+        running = 1
+        last_error = None
+        only_bad_output = True
+        while running:
+            timeout = None
+            if pending:
+                newest = attempts[-1]
+                timeout = max(0.0, newest.started + router.hedge_delay(newest.model) - time.monotonic())
+            try:
+                attempt, content, error = results.get(timeout=timeout)
+            except queue.Empty:
+                log.info(f"{attempts[-1].model} slower than {router.hedge_delay(attempts[-1].model):.1f}s "
+                         f"-- hedging with {pending[0]}")
+                launch()
+                running += 1
+                continue
+
+            running -= 1
+            elapsed = time.monotonic() - attempt.started
+            if error is None:
+                try:
+                    validate(content)
+                except ValueError as e:
+                    error = e
+            if error is None:
+                settled[attempt] = ("ok", elapsed)
+                for other in attempts:
+                    if other is not attempt:
+                        other.cancel()
+                ttft = attempt.ttft or elapsed
+                tps = attempt.tokens_per_sec()
+                router.record_success(attempt.model, elapsed, ttft, tps)
+                metrics.inc("ai_calls_total", model=attempt.model, outcome="ok")
+                metrics.observe("ai.call", time.monotonic() - call_started)
+                log.info(f"AI call succeeded with {attempt.model} in {elapsed:.1f}s "
+                         f"(TTFT {ttft:.1f}s, {tps:.0f} tok/s, "
+                         f"hedge delay now {router.hedge_delay(attempt.model):.1f}s)")
+                return content
+
+            settled[attempt] = ("rejected" if isinstance(error, ValueError) else "error", elapsed)
+            last_error = error
+            only_bad_output = only_bad_output and isinstance(error, ValueError)
+            router.record_failure(attempt.model, error)
+            metrics.inc("ai_calls_total", model=attempt.model, outcome="error")
+            log.warning(f"Model {attempt.model} failed after {elapsed:.1f}s: {error}")
+            if pending:
+                launch()
+                running += 1
+
+        metrics.observe("ai.call", time.monotonic() - call_started)
+        metrics.inc("span_errors_total", span="ai.call")
+        if only_bad_output:
+            raise ValueError(f"No AI model returned usable output. Last error: {last_error}")
+        raise RuntimeError(f"All AI models failed. Last error: {last_error}")
+    finally:
+        # Hedges that lost the race and rejected answers are billed too
+        for attempt in attempts:
+            outcome, secs = settled.get(attempt, ("cancelled", time.monotonic() - attempt.started))
+            _record_attempt(attempt, outcome, secs, prompt_chars)
+
+
+def _extract_json(raw: str) -> dict:
+    """Parse a JSON object out of an AI response. Raises ValueError."""
     # Extract JSON from possible markdown code fences
     match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", raw, re.DOTALL)
     if match:
@@ -129,142 +868,998 @@ def call_ai_json(system_prompt: str, user_prompt: str) -> dict:
         return json.loads(match.group(0))
     raise ValueError(f"Could not parse JSON from AI response: {raw[:200]}")
 
+
+def call_ai_json(system_prompt: str, user_prompt: str) -> dict:
+    """Call AI and parse the response as JSON (unparseable replies fall through)."""
+    raw = call_ai(system_prompt, user_prompt, max_tokens=500, validate=_extract_json, expect="json")
+    return _extract_json(raw)
+
+# ---------------------------------------------------------------------------
+# Persistent AI result cache (LRU + TTL, SQLite under STATE_DIR)
+# ---------------------------------------------------------------------------
+
+def cache_key(*parts: str) -> str:
+    """Stable hash over the given strings."""
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def normalize_instruction(text: str) -> str:
+    """Normalize email text so re-sent and forwarded copies hash the same.
+
+    Drops Re:/Fwd: prefixes, quoted reply lines and whitespace/case noise.
+    """
+    text = re.sub(r"^\s*((re|fwd?|aw|wg)\s*:\s*)+", "", text, flags=re.IGNORECASE)
+    lines = [line for line in text.splitlines() if not line.lstrip().startswith(">")]
+    return re.sub(r"\s+", " ", "\n".join(lines)).strip().lower()
+
+
+class AICache:
+    """Disk-backed LRU cache with TTL for AI results, with hit/miss stats.
+
+    Entries are namespaced by kind ("classify", "edit"). The database is
+    opened lazily so importing this module has no side effects.
+    """
+
+    def __init__(self, path: Path = AI_CACHE_FILE, max_entries: int = AI_CACHE_MAX_ENTRIES,
+                 ttl: float = AI_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = {}
+        self.misses = {}
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " kind TEXT, key TEXT, value TEXT, created REAL, used REAL,"
+                " PRIMARY KEY (kind, key))"
+            )
+        return self._db
+
+    def get(self, kind: str, key: str):
+        """Return the cached value or None (expired entries count as misses)."""
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            row = db.execute(
+                "SELECT value, created FROM cache WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl:
+                db.execute("UPDATE cache SET used = ? WHERE kind = ? AND key = ?", (now, kind, key))
+                db.commit()
+                self.hits[kind] = self.hits.get(kind, 0) + 1
+                value = json.loads(row[0])
+            else:
+                self.misses[kind] = self.misses.get(kind, 0) + 1
+                value = None
+        if value is not None:
+            log.info(f"AI cache hit ({kind}) -- {self.stats()}")
+        return value
+
+    def put(self, kind: str, key: str, value):
+        """Store a value, then evict expired and least recently used entries."""
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(value), now, now),
+            )
+            db.execute("DELETE FROM cache WHERE created < ?", (now - self.ttl,))
+            db.execute(
+                "DELETE FROM cache WHERE rowid NOT IN "
+                "(SELECT rowid FROM cache ORDER BY used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            db.commit()
+
+    def stats(self) -> str:
+        """Hit rates per kind, e.g. 'classify 3/4 hits (75%)'."""
+        parts = []
+        for kind in sorted(set(self.hits) | set(self.misses)):
+            hits = self.hits.get(kind, 0)
+            total = hits + self.misses.get(kind, 0)
+            parts.append(f"{kind} {hits}/{total} hits ({hits / total:.0%})")
+        return ", ".join(parts) or "no lookups yet"
+
+
+ai_cache = AICache()
+
 # ---------------------------------------------------------------------------
 # Email helpers
 # ---------------------------------------------------------------------------
 
 def connect_imap() -> imaplib.IMAP4_SSL:
-    """Connect to the IMAP server and select INBOX."""
+    """Connect and log in to the IMAP server (CONDSTORE enabled if offered).
+
+    imaplib reads the capabilities once, before authentication, and many
+    servers (Dovecot among them) only list IDLE, CONDSTORE, MOVE or UIDPLUS
+    after login -- so conn.capabilities is refreshed from the CAPABILITY
+    code of the LOGIN response, or a CAPABILITY command if it has none.
+    """
     conn = imaplib.IMAP4_SSL(IMAP_HOST, IMAP_PORT)
     conn.login(EMAIL_USER, EMAIL_PASS)
-    conn.select("INBOX")
+    _, data = conn.response("CAPABILITY")
+    if data[-1] is None:
+        _, data = conn.capability()
+    if data and data[-1]:
+        conn.capabilities = tuple(data[-1].decode().upper().split())
+    if "CONDSTORE" in conn.capabilities and "ENABLE" in conn.capabilities:
+        conn.enable("CONDSTORE")
     return conn
 
+# ---------------------------------------------------------------------------
+# Incremental mailbox sync (UIDVALIDITY / last UID / HIGHESTMODSEQ)
+# ---------------------------------------------------------------------------
 
-def rescue_from_junk(conn: imaplib.IMAP4_SSL):
-    """Move any emails from ALLOWED_SENDER out of Junk into INBOX."""
+def load_sync_state() -> dict:
+    """Load the persisted per-mailbox sync state."""
     try:
-        status, _ = conn.select("Junk")
+        return json.loads(SYNC_STATE_FILE.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_sync_state(state: dict):
+    """Persist the per-mailbox sync state atomically."""
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = SYNC_STATE_FILE.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    tmp.replace(SYNC_STATE_FILE)
+
+
+def _response_int(conn: imaplib.IMAP4_SSL, code: str):
+    """Pop a numeric response code (e.g. UIDNEXT) left by the last command."""
+    _, data = conn.response(code)
+    if not data or data[-1] is None:
+        return None
+    return int(data[-1].split()[0])
+
+
+def _drain_new_mail(conn: imaplib.IMAP4_SSL) -> bool:
+    """Pop pending EXISTS/RECENT notifications. True if there were any."""
+    _, exists = conn.response("EXISTS")
+    _, recent = conn.response("RECENT")
+    return exists[0] is not None or recent[0] is not None
+
+
+def _mailbox_state(state: dict, mailbox: str, uidvalidity) -> dict:
+    """Return the sync state for a mailbox, resetting it if UIDVALIDITY changed."""
+    box = state.setdefault(mailbox, {})
+    if box.get("uidvalidity") != uidvalidity:
+        if box:
+            log.info(f"{mailbox} UIDVALIDITY changed -- full resync")
+        box.clear()
+        box.update({"uidvalidity": uidvalidity, "last_uid": 0})
+    return box
+
+
+def advance_watermark(state: dict, mailbox: str, uid: bytes):
+    """Record that every UID up to `uid` in `mailbox` has been handled."""
+    box = state[mailbox]
+    box["last_uid"] = max(box["last_uid"], int(uid))
+    save_sync_state(state)
+
+
+def select_inbox(conn: imaplib.IMAP4_SSL, state: dict) -> bool:
+    """Select INBOX and reconcile it with the persisted sync state.
+
+    Returns True if INBOX may hold mail we haven't scanned yet, i.e. its
+    UIDNEXT or HIGHESTMODSEQ moved since the last time we selected it.
+    """
+    status, _ = conn.select("INBOX")
+    if status != "OK":
+        raise imaplib.IMAP4.error("Could not select INBOX")
+    box = _mailbox_state(state, "INBOX", _response_int(conn, "UIDVALIDITY"))
+    uidnext = _response_int(conn, "UIDNEXT")
+    modseq = _response_int(conn, "HIGHESTMODSEQ")
+    _drain_new_mail(conn)
+
+    unchanged = (
+        uidnext is not None
+        and box.get("uidnext") == uidnext
+        and box.get("highestmodseq") == modseq
+    )
+    box["uidnext"] = uidnext
+    box["highestmodseq"] = modseq
+    save_sync_state(state)
+    return not unchanged
+
+
+def _junk_status(conn: imaplib.IMAP4_SSL) -> dict:
+    """STATUS the Junk folder without selecting it."""
+    items = "UIDNEXT UIDVALIDITY"
+    if "CONDSTORE" in conn.capabilities:
+        items += " HIGHESTMODSEQ"
+    status, data = conn.status(JUNK_FOLDER, f"({items})")
+    if status != "OK":
+        return {}
+    match = re.search(rb"\((.*)\)", data[0])
+    tokens = match.group(1).split() if match else []
+    return {
+        tokens[i].decode().upper(): int(tokens[i + 1])
+        for i in range(0, len(tokens) - 1, 2)
+    }
+
+
+def move_messages(conn: imaplib.IMAP4_SSL, uid_set: str, mailbox: str):
+    """Move messages by UID, using UID MOVE when the server supports it."""
+    if "MOVE" in conn.capabilities:
+        status, data = conn.uid("MOVE", uid_set, mailbox)
+    else:
+        status, data = conn.uid("COPY", uid_set, mailbox)
+        if status == "OK":
+            conn.uid("STORE", uid_set, "+FLAGS", "(\\Deleted)")
+            if "UIDPLUS" in conn.capabilities:
+                status, data = conn.uid("EXPUNGE", uid_set)
+            else:
+                status, data = conn.expunge()
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"Move to {mailbox} failed: {data}")
+
+
+def rescue_from_junk(conn: imaplib.IMAP4_SSL, state: dict) -> bool:
+    """Move new emails from ALLOWED_SENDER out of Junk into INBOX.
+
+    Costs one STATUS per cycle; Junk is only selected and searched when its
+    UIDNEXT or HIGHESTMODSEQ moved since the last check. Leaves INBOX
+    selected and returns True if it may hold mail we haven't scanned: mail
+    was moved, or INBOX changed while Junk was selected (EXISTS for it
+    isn't sent then, so select_inbox compares UIDNEXT instead).
+    """
+    try:
+        current = _junk_status(conn)
+        if "UIDNEXT" not in current:
+            return False
+        box = _mailbox_state(state, JUNK_FOLDER, current.get("UIDVALIDITY"))
+        if (box.get("uidnext") == current["UIDNEXT"]
+                and box.get("highestmodseq") == current.get("HIGHESTMODSEQ")):
+            return False
+    except Exception as e:
+        log.warning(f"Junk folder check failed: {e}")
+        return False
+
+    moved = 0
+    try:
+        status, _ = conn.select(JUNK_FOLDER)
         if status != "OK":
-            return
-        status, data = conn.search(None, f'(FROM "{ALLOWED_SENDER}")')
-        if status != "OK" or not data[0]:
-            conn.select("INBOX")
-            return
-        uids = data[0].split()
-        for uid in uids:
-            conn.copy(uid, "INBOX")
-            conn.store(uid, "+FLAGS", "\\Deleted")
-            log.info(f"Rescued email from Junk folder (UID {uid.decode()})")
-        conn.expunge()
+            raise imaplib.IMAP4.error(f"Could not select {JUNK_FOLDER}")
+        last_uid = box["last_uid"]
+        status, data = conn.uid(
+            "SEARCH", None, f"UID {last_uid + 1}:*", f'FROM "{ALLOWED_SENDER}"'
+        )
+        uids = data[0].split() if status == "OK" and data[0] else []
+        uids = [uid for uid in uids if int(uid) > last_uid]
+        if uids:
+            move_messages(conn, b",".join(uids).decode(), "INBOX")
+            moved = len(uids)
+            log.info(f"Rescued {moved} email(s) from {JUNK_FOLDER} folder")
+        box["last_uid"] = current["UIDNEXT"] - 1
+        box["uidnext"] = current["UIDNEXT"]
+        box["highestmodseq"] = current.get("HIGHESTMODSEQ")
     except Exception as e:
         log.warning(f"Junk folder check failed: {e}")
     finally:
-        conn.select("INBOX")
+        inbox_changed = select_inbox(conn, state)
+
+    if moved:
+        # Our own move bumped Junk's HIGHESTMODSEQ -- record the new baseline
+        box["highestmodseq"] = _junk_status(conn).get("HIGHESTMODSEQ")
+    save_sync_state(state)
+    return bool(moved) or inbox_changed
 
 
-def get_unread_from_sender(conn: imaplib.IMAP4_SSL) -> list:
-    """Return list of UIDs for unread emails from the allowed sender."""
-    status, data = conn.search(None, f'(FROM "{ALLOWED_SENDER}" UNSEEN)')
+def get_unread_from_sender(conn: imaplib.IMAP4_SSL, state: dict) -> list:
+    """Return UIDs of unread emails from the allowed sender above the watermark."""
+    last_uid = state["INBOX"]["last_uid"]
+    status, data = conn.uid(
+        "SEARCH", None, f"UID {last_uid + 1}:*", f'FROM "{ALLOWED_SENDER}"', "UNSEEN"
+    )
     if status != "OK" or not data[0]:
         return []
-    return data[0].split()
-
+    # "N:*" always matches the highest UID, even when that is below N
+    return [uid for uid in data[0].split() if int(uid) > last_uid]
+
+
+_FETCH_TOKEN = re.compile(rb'''\(|\)|"(?:[^"\\]|\\.)*"|[^\s()\[\]"]+(?:\[[^\]]*\])?(?:<\d+>)?''')
+
+
+def _parse_fetch_response(data: list) -> list:
+    """Parse raw imaplib FETCH data into one attribute dict per message.
+
+    imaplib hands back a mix of plain lines and (line, literal) tuples; this
+    turns them into nested lists (NIL -> None) and pairs up each message's
+    attribute names and values, e.g. {b"UID": b"5", b"BODYSTRUCTURE": [...]}.
+    """
+    tokens = []
+    for item in data:
+        if isinstance(item, tuple):
+            text, literal = item
+            tokens.extend(_FETCH_TOKEN.findall(re.sub(rb"\{\d+\}$", b"", text)))
+            tokens.append(("literal", literal))
+        elif item:
+            tokens.extend(_FETCH_TOKEN.findall(item))
+
+    def value(i):
+        tok = tokens[i]
+        if isinstance(tok, tuple):
+            return tok[1], i + 1
+        if tok == b"(":
+            items, i = [], i + 1
+            while tokens[i] != b")":
+                item, i = value(i)
+                items.append(item)
+            return items, i + 1
+        if tok.startswith(b'"'):
+            return re.sub(rb"\\(.)", rb"\1", tok[1:-1]), i + 1
+        return (None if tok.upper() == b"NIL" else tok), i + 1
+
+    messages, i = [], 0
+    while i < len(tokens):
+        if tokens[i] == b"(":
+            attrs, i = value(i)
+            messages.append({
+                attrs[k].upper(): attrs[k + 1] for k in range(0, len(attrs) - 1, 2)
+            })
+        else:
+            i += 1  # message sequence number
+    return messages
+
+
+def _find_text_part(structure: list, section: str = ""):
+    """Locate the text/plain part in a BODYSTRUCTURE.
+
+    Returns (section, transfer_encoding, charset) or None. A single-part
+    text/* message counts as its own plain-text body, as before.
+    """
+    if structure and isinstance(structure[0], list):
+        parts = [p for p in structure if isinstance(p, list)]
+        for n, part in enumerate(parts, 1):
+            found = _find_text_part(part, f"{section}.{n}" if section else str(n))
+            if found:
+                return found
+        return None
 
-def fetch_email(conn: imaplib.IMAP4_SSL, uid: bytes) -> dict:
-    """Fetch an email by UID and return subject + body text."""
-    status, data = conn.fetch(uid, "(RFC822)")
-    if status != "OK":
+    ctype = (structure[0] or b"").lower()
+    subtype = (structure[1] or b"").lower()
+    if ctype != b"text" or (subtype != b"plain" and section):
         return None
+    params = structure[2] or []
+    charset = "utf-8"
+    for k in range(0, len(params) - 1, 2):
+        if params[k].lower() == b"charset" and params[k + 1]:
+            charset = params[k + 1].decode(errors="replace")
+    encoding = (structure[5] or b"7bit").decode().lower()
+    return (section or "1", encoding, charset)
+
+
+def _decode_part(payload: bytes, encoding: str, charset: str) -> str:
+    """Decode a (possibly truncated) body section to text."""
+    if encoding == "base64":
+        raw = re.sub(rb"\s+", b"", payload)
+        payload = base64.b64decode(raw[:len(raw) - len(raw) % 4])
+    elif encoding == "quoted-printable":
+        payload = quopri.decodestring(payload)
+    try:
+        return payload.decode(charset, errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
 
-    msg = email.message_from_bytes(data[0][1])
 
-    # Decode subject
-    subject_parts = decode_header(msg["Subject"] or "")
+def _decode_subject(raw: str) -> str:
+    """Decode an RFC 2047 encoded Subject header."""
     subject = ""
-    for part, encoding in subject_parts:
+    for part, encoding in decode_header(raw or ""):
         if isinstance(part, bytes):
             subject += part.decode(encoding or "utf-8", errors="replace")
         else:
             subject += part
+    return subject
+
+
+def fetch_emails(conn: imaplib.IMAP4_SSL, uids: list) -> dict:
+    """Fetch subject + plain-text body for a batch of UIDs.
+
+    One UID FETCH pulls BODYSTRUCTURE and the From/Subject/Message-ID headers for the
+    whole batch; then only the text/plain section of each message is
+    downloaded (BODY.PEEK, capped at MAX_BODY_BYTES), grouped by section
+    number so the batch costs a couple of round trips. Attachments are
+    never transferred. Returns {uid: email_data, or None if the sender
+    doesn't match}. Raises imaplib.IMAP4.error if a FETCH fails, so the
+    main loop reconnects and retries instead of marking the batch seen.
+    """
+    results = {uid: None for uid in uids}
+    if not uids:
+        return results
+
+    status, data = conn.uid(
+        "FETCH", b",".join(uids).decode(),
+        "(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (FROM SUBJECT MESSAGE-ID)])",
+    )
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"Header FETCH failed: {data}")
 
-    # Decode body (plain text preferred)
-    body = ""
-    if msg.is_multipart():
-        for part in msg.walk():
-            if part.get_content_type() == "text/plain":
-                charset = part.get_content_charset() or "utf-8"
-                body = part.get_payload(decode=True).decode(charset, errors="replace")
-                break
-    else:
-        charset = msg.get_content_charset() or "utf-8"
-        body = msg.get_payload(decode=True).decode(charset, errors="replace")
+    sections = {}
+    for attrs in _parse_fetch_response(data):
+        uid = attrs.get(b"UID")
+        if uid not in results:
+            continue
+        header_bytes = next(
+            (v for k, v in attrs.items() if k.startswith(b"BODY[HEADER")), b""
+        )
+        headers = email.message_from_bytes(header_bytes or b"")
 
-    # Double-check sender
-    sender = msg.get("From", "")
-    if ALLOWED_SENDER not in sender.lower():
-        log.warning(f"Sender mismatch: {sender}")
-        return None
+        # Double-check sender
+        sender = headers.get("From", "")
+        if ALLOWED_SENDER not in sender.lower():
+            log.warning(f"Sender mismatch: {sender}")
+            continue
+
+        results[uid] = {
+            "subject": _decode_subject(headers["Subject"]),
+            "body": "",
+            "from": sender,
+            "message_id": (headers.get("Message-ID") or "").strip(),
+        }
+        part = _find_text_part(attrs.get(b"BODYSTRUCTURE") or [])
+        if part:
+            sections.setdefault(part[0], []).append((uid, part[1], part[2]))
+
+    # Download only the text/plain section, one round trip per section number
+    for section, members in sections.items():
+        status, data = conn.uid(
+            "FETCH", b",".join(uid for uid, _, _ in members).decode(),
+            f"(UID BODY.PEEK[{section}]<0.{MAX_BODY_BYTES}>)",
+        )
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"Body FETCH of section {section} failed: {data}")
+        bodies = {}
+        for attrs in _parse_fetch_response(data):
+            payload = next(
+                (v for k, v in attrs.items() if k.startswith(b"BODY[")), None
+            )
+            bodies[attrs.get(b"UID")] = payload or b""
+        for uid, encoding, charset in members:
+            payload = bodies.get(uid, b"")
+            if len(payload) >= MAX_BODY_BYTES:
+                log.warning(f"Body of UID {uid.decode()} truncated at {MAX_BODY_BYTES} bytes")
+            results[uid]["body"] = _decode_part(payload, encoding, charset)
+
+    return results
+
+
+def supports_idle(conn: imaplib.IMAP4_SSL) -> bool:
+    """Return True if the server advertises the IDLE capability."""
+    return "IDLE" in conn.capabilities
+
+
+def _idle_readline(sock) -> bytes:
+    """Read one CRLF-terminated line straight from the socket.
+
+    Reads byte-wise so nothing is left buffered where imaplib can't see it
+    once IDLE ends and normal commands resume on the same connection.
+    """
+    line = bytearray()
+    while not line.endswith(b"\r\n"):
+        chunk = sock.recv(1)
+        if not chunk:
+            raise imaplib.IMAP4.abort("Connection closed during IDLE")
+        line += chunk
+    return bytes(line)
+
+
+def idle_wait(conn: imaplib.IMAP4_SSL, timeout: float, wake_fd: int = None) -> bool:
+    """Block in IMAP IDLE until new mail arrives or timeout expires.
+
+    Returns True if the server sent an EXISTS/RECENT notification, False
+    if the timeout ran out (the caller should simply re-issue IDLE) or
+    `wake_fd` became readable.
+    """
+    sock = conn.socket()
+    tag = conn._new_tag()
+    conn.send(tag + b" IDLE\r\n")
+    line = _idle_readline(sock)
+    if not line.startswith(b"+"):
+        raise imaplib.IMAP4.error(f"IDLE rejected: {line.decode(errors='replace').strip()}")
+
+    deadline = time.monotonic() + timeout
+    woke = False
+    while not woke:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # SSL may already hold a decrypted record that select() can't see
+        if not getattr(sock, "pending", lambda: 0)():
+            watch = [sock] if wake_fd is None else [sock, wake_fd]
+            ready, _, _ = select.select(watch, [], [], remaining)
+            if not ready or (wake_fd in ready and sock not in ready):
+                break
+        line = _idle_readline(sock)
+        if line.startswith(b"* BYE"):
+            raise imaplib.IMAP4.abort(f"Server closed IDLE: {line.decode(errors='replace').strip()}")
+        if re.match(rb"\* \d+ (EXISTS|RECENT)", line):
+            woke = True
 
-    return {"subject": subject, "body": body, "from": sender}
+    conn.send(b"DONE\r\n")
+    while True:
+        line = _idle_readline(sock)
+        if line.startswith(tag):
+            if not line[len(tag):].strip().startswith(b"OK"):
+                raise imaplib.IMAP4.error(f"IDLE failed: {line.decode(errors='replace').strip()}")
+            break
+        # New mail can still be announced between the timeout and DONE
+        if re.match(rb"\* \d+ (EXISTS|RECENT)", line):
+            woke = True
+    return woke
 
 
 def mark_as_seen(conn: imaplib.IMAP4_SSL, uid: bytes):
     """Mark an email as seen/read."""
-    conn.store(uid, "+FLAGS", "\\Seen")
+    conn.uid("STORE", uid, "+FLAGS", "(\\Seen)")
 
 
 def send_reply(to_addr: str, subject: str, body: str):
-    """Send a reply email via SMTP."""
-    msg = MIMEText(body, "plain", "utf-8")
-    msg["From"] = EMAIL_USER
-    msg["To"] = to_addr
-    msg["Subject"] = subject
+    """Queue a reply email; the outbox sends it in the background."""
+    outbox.put(to_addr, subject, body)
+
+# ---------------------------------------------------------------------------
+# Outbox (disk-backed replies, sent over one persistent SMTP session)
+# ---------------------------------------------------------------------------
+
+class Outbox:
+    """Reply queue on disk, drained by a background SMTP sender.
+
+    put() writes the message to OUTBOX_DIR and returns at once, so
+    processing never waits on the mail server. The sender thread keeps one
+    authenticated SMTP session open (closed after SMTP_IDLE_TIMEOUT of
+    inactivity), reconnects once if the server dropped it, and retries
+    failed messages with exponential backoff. Messages still queued at
+    shutdown are sent on the next start; ones that fail permanently or
+    exceed OUTBOX_MAX_ATTEMPTS are moved to OUTBOX_DIR/failed.
+    """
+
+    def __init__(self, path: Path = OUTBOX_DIR):
+        self.path = path
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._thread = None
+        self._server = None
+        self._last_used = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="outbox", daemon=True)
+                self._thread.start()
+
+    def put(self, to_addr: str, subject: str, body: str) -> str:
+        """Queue a message for delivery. Returns its outbox id."""
+        with self._lock:
+            self._seq += 1
+            msg_id = f"{time.time_ns()}-{self._seq:04d}"
+        entry = {
+            "to": to_addr, "subject": subject, "body": body,
+            "queued": time.time(), "attempts": 0, "next_try": 0, "last_error": None,
+        }
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._write(self.path / f"{msg_id}.json", entry)
+        log.info(f"Reply queued for {to_addr}: {subject}")
+        self.start()
+        self._wake.set()
+        return msg_id
+
+    def pending(self) -> int:
+        return len(list(self.path.glob("*.json")))
+
+    @staticmethod
+    def _write(path: Path, entry: dict):
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry))
+        tmp.replace(path)
+
+    def _loop(self):
+        while True:
+            self._wake.clear()
+            wait = self._drain()
+            if self._server is not None:
+                idle_for = time.monotonic() - self._last_used
+                if idle_for >= SMTP_IDLE_TIMEOUT:
+                    self._disconnect()
+                else:
+                    wait = min(wait or SMTP_IDLE_TIMEOUT, SMTP_IDLE_TIMEOUT - idle_for)
+            self._wake.wait(wait)
+
+    def _drain(self):
+        """Send every due message in queue order.
+
+        Returns seconds until the next retry is due, or None if the outbox
+        is empty. Stops at the first failure -- the server is likely down,
+        so later messages would fail the same way.
+        """
+        with file_lock(self.path / ".lock"):
+            return self._drain_locked()
+
+    def _drain_locked(self):
+        # Other instances share OUTBOX_DIR; listing under the lock means a
+        # message another sender already delivered (and unlinked) is never resent
+        now = time.time()
+        next_due = None
+        for path in sorted(self.path.glob("*.json")):
+            try:
+                entry = json.loads(path.read_text())
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            if entry["next_try"] > now:
+                next_due = min(next_due or entry["next_try"], entry["next_try"])
+                continue
+            if not self._deliver(path, entry):
+                return max(0.0, entry["next_try"] - time.time())
+        return None if next_due is None else max(0.0, next_due - time.time())
+
+    def _deliver(self, path: Path, entry: dict) -> bool:
+        msg = MIMEText(entry["body"], "plain", "utf-8")
+        msg["From"] = EMAIL_USER
+        msg["To"] = entry["to"]
+        msg["Subject"] = entry["subject"]
+        try:
+            with metrics.span("smtp.send"):
+                self._send(msg)
+        except Exception as e:
+            metrics.inc("replies_total", outcome="error")
+            self._disconnect()
+            entry["attempts"] += 1
+            entry["last_error"] = str(e)[:200]
+            permanent = isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500
+            if permanent or entry["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+                log.error(f"Giving up on reply to {entry['to']} ({entry['subject']}) "
+                          f"after {entry['attempts']} attempt(s): {e}")
+                failed = self.path / "failed"
+                failed.mkdir(exist_ok=True)
+                self._write(failed / path.name, entry)
+                path.unlink(missing_ok=True)
+                return True
+            delay = min(OUTBOX_MAX_BACKOFF, OUTBOX_RETRY_BASE * 2 ** (entry["attempts"] - 1))
+            entry["next_try"] = time.time() + delay
+            self._write(path, entry)
+            log.warning(f"Reply to {entry['to']} failed (attempt {entry['attempts']}): {e}. "
+                        f"Retrying in {delay}s")
+            return False
+        path.unlink(missing_ok=True)
+        metrics.inc("replies_total", outcome="sent")
+        waited = time.time() - entry["queued"]
+        metrics.observe("outbox.wait", waited)
+        log.info(f"Reply sent to {entry['to']}: {entry['subject']} (queued {waited:.1f}s)")
+        return True
+
+    def _send(self, msg: MIMEText):
+        reused = self._server is not None
+        if not reused:
+            self._connect()
+        try:
+            self._server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            if not reused:
+                raise
+            # The server closed our idle session -- log in again once
+            self._disconnect()
+            self._connect()
+            self._server.send_message(msg)
+        self._last_used = time.monotonic()
+
+    def _connect(self):
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            server.starttls()
+            server.login(EMAIL_USER, EMAIL_PASS)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self._last_used = time.monotonic()
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASS)
-        server.send_message(msg)
 
-    log.info(f"Reply sent to {to_addr}: {subject}")
+outbox = Outbox()
+
 
 # ---------------------------------------------------------------------------
 # Article helpers
 # ---------------------------------------------------------------------------
 
+# Parsed articles, revalidated by mtime/size (inotify or a periodic scan)
+article_index = ArticleIndex(CONTENT_DIR)
+
+
 def get_article_slugs() -> list[str]:
     """Return list of existing country article slugs (filenames without .md)."""
-    slugs = []
-    for f in CONTENT_DIR.glob("*.md"):
-        if f.name == "_index.md":
-            continue
-        slugs.append(f.stem)
-    return sorted(slugs)
+    return article_index.slugs()
 
 
 def read_article(slug: str) -> str:
     """Read a country article's markdown content."""
-    path = CONTENT_DIR / f"{slug}.md"
-    return path.read_text(encoding="utf-8")
+    return article_index.read(slug)
+
+
+def article_paths(slug: str) -> list[str]:
+    """Project-relative paths an edit of `slug` changes."""
+    return [str((CONTENT_DIR / f"{slug}.md").relative_to(PROJECT_DIR))]
+
+
+def created_paths(slug: str) -> list[str]:
+    """Project-relative paths generate-article.js writes for a new `slug`."""
+    return article_paths(slug) + [f"static/images/countries/{slug}",
+                                  str(QUEUE_FILE.relative_to(PROJECT_DIR))]
 
 
 def write_article(slug: str, content: str):
     """Write updated markdown content to a country article."""
     path = CONTENT_DIR / f"{slug}.md"
     path.write_text(content, encoding="utf-8")
+    article_index.invalidate(slug)
     log.info(f"Updated article: {slug}")
 
+# ---------------------------------------------------------------------------
+# Local fast-path intent classification
+# ---------------------------------------------------------------------------
+
+COUNTRY_ALIASES = {
+    "britain": "united-kingdom", "great britain": "united-kingdom",
+    "england": "united-kingdom", "scotland": "united-kingdom", "wales": "united-kingdom",
+    "dubai": "united-arab-emirates",
+    "holland": "netherlands", "czechia": "czech-republic", "korea": "south-korea",
+    "burma": "myanmar",
+}
+# Matched case-sensitively: "US" is a country, "us" is a pronoun
+COUNTRY_ACRONYMS = {
+    "US": "united-states", "USA": "united-states", "UK": "united-kingdom",
+    "UAE": "united-arab-emirates", "DRC": "democratic-republic-of-the-congo",
+}
+
+CREATE_PATTERN = re.compile(
+    r"\b(create|write|generate|new|start)\b.{0,40}\b(article|guide|page|post)\b"
+    r"|\b(article|guide|page|post)\s+(about|on|for)\b",
+    re.IGNORECASE,
+)
+# The selection must be what the quantifier is about: "all Europe articles",
+# "each of the tier 1 guides" -- {regions} is filled in per call
+BULK_PATTERN = (
+    r"\b(?:all|every|each)\s+(?:of\s+)?(?:the\s+|our\s+)?"
+    r"(?:tier\s*(?P<tier>[123])\s+)?(?:(?P<region>{regions})\s+)?(?:tier\s*(?P<tier_after>[123])\s+)?"
+    r"(?:articles?|countries|guides?|pages?|posts?)\b"
+)
+UPDATE_PATTERN = re.compile(
+    r"\b(update|fix|change|correct|add|mention|remove|delete|edit|rewrite|replace|"
+    r"include|expand|shorten|improve|adjust|tweak)\b",
+    re.IGNORECASE,
+)
+
+
+def _trigrams(text: str) -> set:
+    text = f"  {text.lower()} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _similarity(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class CountryIndex:
+    """Alias and trigram index over data/countries.json.
+
+    Reloads itself when the file changes on disk.
+    """
+
+    FUZZY_THRESHOLD = 0.6
+
+    def __init__(self, path: Path = COUNTRIES_FILE):
+        self.path = path
+        self._mtime = None
+        self.countries = {}
+        self._aliases = []
+        self._acronyms = {}
+        self._trigrams = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        mtime = self.path.stat().st_mtime
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            countries = {c["slug"]: c for c in json.loads(self.path.read_text(encoding="utf-8"))}
+            aliases = {c["name"].lower(): slug for slug, c in countries.items()}
+            aliases.update({slug.replace("-", " "): slug for slug in countries})
+            aliases.update({a: s for a, s in COUNTRY_ALIASES.items() if s in countries})
+            self._acronyms = {a: s for a, s in COUNTRY_ACRONYMS.items() if s in countries}
+            self.countries = countries
+            self._trigrams = {alias: _trigrams(alias) for alias in aliases if len(alias) > 4}
+            # Region names map to None: they are blanked out so "Central America"
+            # never reads as a country. Longest first, so "democratic republic
+            # of the congo" beats "congo" and "south africa" beats "africa".
+            aliases.update({c["region"].lower(): None for c in countries.values()
+                            if c["region"].lower() not in aliases})
+            self._aliases = sorted(aliases.items(), key=lambda item: -len(item[0]))
+            self._mtime = mtime
+
+    def find_mentions(self, text: str) -> list[str]:
+        """Slugs of countries named in the text, in order of appearance.
+
+        Exact alias matches first (acronyms like "US" only in capitals,
+        region names skipped); if there are none, fuzzy trigram matches of
+        1-3 word phrases catch typos like "Argentinia".
+        """
+        self._ensure_loaded()
+        found = []
+        for acronym, slug in self._acronyms.items():
+            for match in re.finditer(rf"\b{acronym}\b", text):
+                found.append((match.start(), slug))
+        lowered = text.lower()
+        for alias, slug in self._aliases:
+            for match in re.finditer(rf"\b{re.escape(alias)}\b", lowered):
+                if slug:
+                    found.append((match.start(), slug))
+                lowered = lowered[:match.start()] + " " * len(alias) + lowered[match.end():]
+        if not found:
+            words = re.findall(r"[a-z]+", lowered)
+            for n in (3, 2, 1):
+                for i in range(len(words) - n + 1):
+                    phrase = " ".join(words[i:i + n])
+                    if len(phrase) < 5:
+                        continue
+                    grams = _trigrams(phrase)
+                    for alias, alias_grams in self._trigrams.items():
+                        if _similarity(grams, alias_grams) >= self.FUZZY_THRESHOLD:
+                            found.append((i, dict(self._aliases)[alias]))
+        slugs = []
+        for _, slug in sorted(found):
+            if slug not in slugs:
+                slugs.append(slug)
+        return slugs
+
+    def snap(self, slug: str, candidates: list[str]):
+        """Nearest candidate slug to a (possibly made-up) slug, or None.
+
+        A candidate embedded in the slug wins outright (the model likes to
+        return frontmatter slugs such as "best-time-to-visit-japan");
+        otherwise the closest trigram match above FUZZY_THRESHOLD.
+        """
+        if slug in candidates:
+            return slug
+        padded = f"-{slug.lower().replace('_', '-').replace(' ', '-')}-"
+        embedded = [c for c in candidates if f"-{c}-" in padded]
+        if embedded:
+            return max(embedded, key=len)
+        grams = _trigrams(slug.replace("-", " "))
+        best, score = None, 0.0
+        for candidate in candidates:
+            sim = _similarity(grams, _trigrams(candidate.replace("-", " ")))
+            if sim > score:
+                best, score = candidate, sim
+        return best if score >= self.FUZZY_THRESHOLD else None
+
+    def regions(self) -> list[str]:
+        self._ensure_loaded()
+        return sorted({c["region"] for c in self.countries.values()})
+
+    def name(self, slug: str) -> str:
+        self._ensure_loaded()
+        country = self.countries.get(slug)
+        return country["name"] if country else slug.replace("-", " ").title()
+
+
+country_index = CountryIndex()
+
+
+def classify_bulk_locally(text: str):
+    """Bulk update intent for "... all Europe articles" / "every tier 1 guide"."""
+    if not UPDATE_PATTERN.search(text) or CREATE_PATTERN.search(text):
+        return None
+    regions = sorted(country_index.regions(), key=len, reverse=True)
+    pattern = BULK_PATTERN.format(regions="|".join(re.escape(region) for region in regions))
+    match = re.search(pattern, text, re.IGNORECASE)
+    if not match:
+        return None
+    selection = {}
+    if match.group("region"):
+        selection["region"] = next(r for r in regions if r.lower() == match.group("region").lower())
+    tier = match.group("tier") or match.group("tier_after")
+    if tier:
+        selection["tier"] = int(tier)
+    return selection or None
+
+
+def classify_locally(subject: str, body: str, slugs: list[str]):
+    """Resolve clear-cut emails without an AI call.
+
+    Confident only when exactly one country is named and the verbs point
+    one way: an update of an existing article, or a new article for a
+    country we don't cover yet. Bulk edits by region or tier are spotted
+    too, but only when no country is named. Returns an intent dict or None.
+    """
+    text = f"{subject}\n{body}".strip()
+    summary = subject.strip() or text.splitlines()[0]
+    mentions = country_index.find_mentions(text)
+    if not mentions:
+        selection = classify_bulk_locally(text)
+        if selection:
+            return {"action": "bulk_update", "targets": selection, "summary": summary, "details": text}
+    if len(mentions) != 1:
+        return None
+    slug = mentions[0]
+    wants_create = bool(CREATE_PATTERN.search(text))
+    wants_update = bool(UPDATE_PATTERN.search(text))
+
+    if wants_create and slug not in slugs:
+        action = "create_article"
+    elif wants_update and not wants_create and slug in slugs:
+        action = "update_article"
+    else:
+        return None
+
+    return {
+        "action": action,
+        "target_slug": slug,
+        "country_name": country_index.name(slug),
+        "summary": summary,
+        "details": text,
+    }
+
+
+def snap_intent(intent: dict, slugs: list[str]) -> dict:
+    """Snap a model-returned target_slug onto a real slug when it's close."""
+    slug = intent.get("target_slug") or ""
+    action = intent.get("action")
+    if action == "bulk_update":
+        return intent
+    if action == "update_article":
+        candidates = slugs
+    elif action == "create_article":
+        country_index._ensure_loaded()
+        candidates = list(country_index.countries)
+    else:
+        return intent
+    snapped = country_index.snap(slug, candidates)
+    if snapped and snapped != slug:
+        log.info(f"Snapped target_slug '{slug}' -> '{snapped}'")
+        intent["target_slug"] = snapped
+    return intent
+
 # ---------------------------------------------------------------------------
 # Intent classification
 # ---------------------------------------------------------------------------
 
 def classify_intent(subject: str, body: str, slugs: list[str]) -> dict:
-    """Use a cheap AI call to classify what the email is asking for."""
+    """Classify what the email is asking for.
+
+    Clear-cut emails are resolved locally; the rest go to a cheap AI call
+    whose target_slug is snapped onto the nearest real slug.
+    """
+    intent = classify_locally(subject, body, slugs)
+    if intent:
+        log.info(f"Classified locally: {intent['action']} "
+                 f"{intent.get('target_slug') or intent.get('targets')}")
+        return intent
+
     system_prompt = (
         "You classify email instructions for a travel blog editor. "
         "Return ONLY valid JSON with these fields:\n"
-        '  "action": "update_article" | "create_article" | "unknown"\n'
+        '  "action": "update_article" | "bulk_update" | "create_article" | "unknown"\n'
         '  "target_slug": slug string (for updates) or new slug (for creates)\n'
+        '  "targets": for bulk_update (one change to many articles), any of '
+        '{"region": region, "tier": 1-3, "slugs": [slug, ...]}\n'
         '  "country_name": full country name (for creates)\n'
         '  "summary": one-line summary of what to do\n'
         '  "details": the full edit instructions\n'
@@ -272,70 +1867,730 @@ def classify_intent(subject: str, body: str, slugs: list[str]) -> dict:
     user_prompt = (
         f"Email subject: {subject}\n"
         f"Email body: {body}\n\n"
-        f"Existing article slugs: {', '.join(slugs)}\n\n"
+        f"Existing article slugs: {', '.join(slugs)}\n"
+        f"Regions: {', '.join(country_index.regions())}\n\n"
         "Classify this email and return JSON."
     )
-    return call_ai_json(system_prompt, user_prompt)
+    key = cache_key(normalize_instruction(f"{subject}\n{body}"), ",".join(slugs))
+    intent = ai_cache.get("classify", key)
+    if intent is None:
+        intent = call_ai_json(system_prompt, user_prompt)
+        ai_cache.put("classify", key, intent)
+    return snap_intent(intent, slugs)
 
 # ---------------------------------------------------------------------------
-# Actions
+# Article validation (same rules as scripts/validate-article.js)
 # ---------------------------------------------------------------------------
 
-def update_article(slug: str, instructions: str) -> str:
-    """Update an existing article based on AI-interpreted instructions."""
-    current_content = read_article(slug)
+MIN_WORDS = 1400
+MAX_WORDS = 5000
+REQUIRED_FAQ_COUNT = 5
+MIN_REFERENCES = 3
+MAX_DESCRIPTION_LENGTH = 160
 
+# The 6 core H2 sections every article must have (partial match)
+REQUIRED_H2S = [
+    "At a Glance", "Month-by-Month", "Activities",
+    "Peak Season", "Regional Climate", "Budget Tips",
+]
+VALID_MONTHS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+VALID_REGIONS = [
+    "Africa", "Asia", "Caribbean", "Central America",
+    "Europe", "Middle East", "North America", "Oceania", "South America",
+]
+
+
+def validate_article(content: str) -> dict:
+    """Check an article against the publishing rules.
+
+    Returns {"words": n, "errors": {rule: message}, "warnings": [...]};
+    errors block publishing, warnings don't. Mirrors validateArticle() in
+    scripts/validate-article.js, including its split on '---'.
+    """
+    errors = {}
+    warnings = []
+    parts = content.split("---")
+    if len(parts) < 3:
+        return {"words": 0, "errors": {"frontmatter": "Missing or malformed frontmatter"},
+                "warnings": warnings}
+    frontmatter = parts[1]
+    body = "---".join(parts[2:])
+
+    words = len(body.split())
+    if words < MIN_WORDS:
+        errors["words"] = f"Too short: {words} words (min {MIN_WORDS})"
+    if words > MAX_WORDS:
+        warnings.append(f"Very long: {words} words (max {MAX_WORDS})")
+
+    best_months = re.search(r'best_months:\s*"(.+?)"', frontmatter)
+    if not best_months:
+        errors["best_months"] = "Missing best_months in frontmatter"
+    elif not any(month in best_months.group(1) for month in VALID_MONTHS):
+        errors["best_months"] = (
+            f'best_months "{best_months.group(1)}" does not contain valid month names (Jan-Dec)'
+        )
+
+    for section in REQUIRED_H2S:
+        if not re.search(rf"^##.*{re.escape(section)}", body, re.IGNORECASE | re.MULTILINE):
+            errors[f"section:{section}"] = f'Missing required section containing "{section}"'
+
+    faq_count = frontmatter.count("- question:")
+    if faq_count != REQUIRED_FAQ_COUNT:
+        errors["faq"] = f"Expected {REQUIRED_FAQ_COUNT} FAQs, found {faq_count}"
+
+    ref_count = frontmatter.count("- title:")
+    if ref_count < MIN_REFERENCES:
+        warnings.append(f"Only {ref_count} references in frontmatter (recommend {MIN_REFERENCES}+)")
+
+    for field, label in (("climate_chart", "Climate chart"), ("hero_image", "Hero image")):
+        match = re.search(rf'{field}:\s*"(.+?)"', frontmatter)
+        if match:
+            if not ((PROJECT_DIR / match.group(1)).exists()
+                    or (PROJECT_DIR / "static" / match.group(1)).exists()):
+                warnings.append(f"{label} file not found: {match.group(1)}")
+        elif field == "hero_image":
+            warnings.append("No hero image set")
+
+    region = re.search(r'region:\s*"(.+?)"', frontmatter)
+    if region and region.group(1) not in VALID_REGIONS:
+        warnings.append(f'Region "{region.group(1)}" is not one of: {", ".join(VALID_REGIONS)}')
+
+    description = re.search(r'description:\s*"(.+?)"', frontmatter)
+    if description and len(description.group(1)) > MAX_DESCRIPTION_LENGTH:
+        warnings.append(f"Description is {len(description.group(1))} chars (max {MAX_DESCRIPTION_LENGTH})")
+
+    if "tourradar_url:" not in frontmatter or 'tourradar_url: ""' in frontmatter:
+        warnings.append("No tourradar_url in frontmatter")
+
+    country = re.search(r'country_name:\s*"(.+?)"', frontmatter)
+    if country:
+        keyword = f"best time to visit {country.group(1)}".lower()
+        count = body.lower().count(keyword)
+        if count < 2:
+            warnings.append(f'Keyword "{keyword}" only appears {count} times (target: 4-6)')
+
+    return {"words": words, "errors": errors, "warnings": warnings}
+
+
+def check_edit(original: str, updated: str):
+    """Reject an edit that breaks a rule the original article passed.
+
+    Raises ValueError listing the new errors. Rules the article already
+    failed before the edit don't block it, so an old article that is e.g.
+    a little short can still be edited.
+    """
+    before = validate_article(original)["errors"]
+    after = validate_article(updated)["errors"]
+    new = [message for rule, message in after.items() if rule not in before]
+    if new:
+        raise ValueError(f"Edit fails validation: {'; '.join(new)}")
+
+# ---------------------------------------------------------------------------
+# Section-level article patching
+# ---------------------------------------------------------------------------
+
+def split_article(content: str) -> tuple[list, list]:
+    """Split markdown into frontmatter field blocks and H2/H3 body sections.
+
+    Returns (frontmatter_blocks, body_sections), each a list of
+    (block_id, text). join_article() puts them back together byte for byte.
+    Frontmatter ids are "fm.<field>", body ids "s<N>" (s0 = text before
+    the first heading).
+    """
+    match = re.match(r"---\n(.*?\n)---\n", content, re.DOTALL)
+    if not match:
+        raise ValueError("Missing or malformed frontmatter")
+
+    frontmatter = []
+    for line in match.group(1).splitlines(keepends=True):
+        field = re.match(r"([A-Za-z_][\w-]*):", line)
+        if field or not frontmatter:
+            frontmatter.append([f"fm.{field.group(1) if field else ''}", line])
+        else:
+            frontmatter[-1][1] += line
+
+    sections = [["s0", ""]]
+    in_fence = False
+    for line in content[match.end():].splitlines(keepends=True):
+        if line.startswith("```"):
+            in_fence = not in_fence
+        if not in_fence and re.match(r"#{2,3} ", line):
+            sections.append([f"s{len(sections)}", line])
+        else:
+            sections[-1][1] += line
+
+    return [tuple(b) for b in frontmatter], [tuple(s) for s in sections if s[1]]
+
+
+def join_article(frontmatter: list, sections: list) -> str:
+    """Inverse of split_article()."""
+    return (
+        "---\n" + "".join(text for _, text in frontmatter)
+        + "---\n" + "".join(text for _, text in sections)
+    )
+
+
+def set_lastmod(content: str) -> str:
+    """Stamp the frontmatter 'lastmod' with the current UTC time."""
+    stamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    return re.sub(r'^lastmod: ".*"$', f'lastmod: "{stamp}"', content, count=1, flags=re.MULTILINE)
+
+
+def _splice_block(original: str, replacement: str) -> str:
+    """Keep the original block's trailing blank lines around the new text."""
+    trailing = original[len(original.rstrip("\n")):]
+    return replacement.strip("\n") + (trailing or "\n")
+
+
+def patch_article(content: str, instructions: str) -> str:
+    """Edit only the frontmatter fields / sections the instructions touch.
+
+    A small planning call picks the blocks from the article outline; only
+    those blocks go to the model and come back between <<<BLOCK id>>> /
+    <<<END>>> markers to be spliced in place. Raises ValueError when the
+    plan or the reply can't be used, so the caller can fall back to a
+    full-article edit.
+    """
+    frontmatter, sections = split_article(content)
+    blocks = dict(frontmatter + sections)
+
+    outline = "\n".join(
+        [f"{block_id}: frontmatter field" for block_id, _ in frontmatter if block_id != "fm."]
+        + [f"{block_id}: {text.splitlines()[0][:80]}" for block_id, text in sections]
+    )
+    plan = call_ai_json(
+        "You plan minimal edits to a travel article. Given edit instructions and "
+        "the article outline (block id: frontmatter field or first line of the "
+        "section), return ONLY valid JSON: {\"blocks\": [block ids]} listing the "
+        "fewest blocks that must change. To add new content, pick the block it "
+        "should follow.",
+        f"INSTRUCTIONS: {instructions}\n\nOUTLINE:\n{outline}",
+    )
+    targets = [b for b in plan.get("blocks", []) if b in blocks and b != "fm."]
+    if not targets:
+        raise ValueError("plan named no usable blocks")
+    if len(targets) > len(blocks) // 2:
+        raise ValueError(f"plan touches {len(targets)} of {len(blocks)} blocks")
+
+    excerpt = "\n".join(f"<<<BLOCK {b}>>>\n{blocks[b].strip(chr(10))}\n<<<END>>>" for b in targets)
+    system_prompt = (
+        "You are Elena Vasquez, senior travel editor with 15 years of experience. "
+        "You are editing excerpts of an existing travel article. Each excerpt is "
+        "wrapped in <<<BLOCK id>>> ... <<<END>>> markers. Return EVERY block with "
+        "the same markers and its complete updated text. Make only the requested "
+        "changes and preserve formatting; frontmatter blocks must stay valid YAML "
+        "starting with the same field name. To add a new section, append it inside "
+        "the block it should follow. Return nothing outside the markers."
+    )
+    user_prompt = f"INSTRUCTIONS: {instructions}\n\nEXCERPTS:\n{excerpt}"
+    max_tokens = min(8000, 1000 + len(excerpt) // 2)
+
+    def apply(raw):
+        returned = dict(re.findall(r"<<<BLOCK ([\w.-]+)>>>\n?(.*?)\n?<<<END>>>", raw, re.DOTALL))
+        missing = [b for b in targets if b not in returned]
+        if missing:
+            raise ValueError(f"reply is missing blocks: {', '.join(missing)}")
+        for block_id in targets:
+            if block_id.startswith("fm.") and not returned[block_id].startswith(f"{block_id[3:]}:"):
+                raise ValueError(f"reply mangled frontmatter field {block_id[3:]}")
+
+        def patch(items):
+            return [(b, _splice_block(t, returned[b]) if b in targets else t) for b, t in items]
+
+        return join_article(patch(frontmatter), patch(sections))
+
+    def validate(raw):
+        check_edit(content, apply(raw))
+
+    # A reply that breaks the article is rejected per model, so the next one gets a go
+    raw = call_ai(system_prompt, user_prompt, max_tokens=max_tokens, validate=validate,
+                  expect="blocks")
+    log.info(f"Section patch: {len(targets)} of {len(blocks)} blocks ({', '.join(targets)})")
+    return apply(raw)
+
+
+def rewrite_article(content: str, instructions: str) -> str:
+    """Full-article edit: send the whole file and take the whole file back."""
     system_prompt = (
         "You are Elena Vasquez, senior travel editor with 15 years of experience. "
         "You are editing an existing travel article. Return the COMPLETE updated "
         "markdown file (including frontmatter). Make only the requested changes -- "
         "do NOT rewrite sections that don't need changing. Preserve all frontmatter "
-        "fields, formatting, HTML comments, and structure. Update the 'lastmod' date "
-        f'to "{datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")}".'
+        "fields, formatting, HTML comments, and structure."
     )
     user_prompt = (
         f"INSTRUCTIONS: {instructions}\n\n"
-        f"CURRENT ARTICLE:\n{current_content}"
+        f"CURRENT ARTICLE:\n{content}"
     )
 
-    updated = call_ai(system_prompt, user_prompt, max_tokens=8000)
+    def unwrap(updated):
+        # Strip markdown code fences if the AI wrapped the response
+        if updated.startswith("```"):
+            updated = re.sub(r"^```\w*\n?", "", updated)
+            updated = re.sub(r"\n?```$", "", updated)
+        return updated
+
+    updated = call_ai(system_prompt, user_prompt, max_tokens=8000,
+                      validate=lambda raw: check_edit(content, unwrap(raw)), expect="article")
+    return unwrap(updated)
 
-    # Strip markdown code fences if the AI wrapped the response
-    if updated.startswith("```"):
-        updated = re.sub(r"^```\w*\n?", "", updated)
-        updated = re.sub(r"\n?```$", "", updated)
+# ---------------------------------------------------------------------------
+# Actions
+# ---------------------------------------------------------------------------
+
+def combine_instructions(instructions: list[str]) -> str:
+    """One edit request covering several instructions for the same article."""
+    if len(instructions) == 1:
+        return instructions[0]
+    numbered = "\n\n".join(f"{i}. {text}" for i, text in enumerate(instructions, 1))
+    return (f"Apply all {len(instructions)} of these changes (if two conflict, "
+            f"the later one wins):\n\n{numbered}")
+
+
+def update_article(slug: str, instructions: str) -> str:
+    """Update an existing article based on AI-interpreted instructions.
+
+    Tries a section-level patch first and falls back to a full-article
+    edit. 'lastmod' is stamped locally rather than by the model. Results
+    are cached by instruction + article hash, and the written article is
+    cached too, so re-sending an instruction that was already applied
+    leaves the file untouched (and the caller skips the deploy).
+    """
+    current_content = read_article(slug)
+    instruction_key = normalize_instruction(instructions)
+    content_hash = hashlib.sha256(current_content.encode()).hexdigest()
+
+    updated = ai_cache.get("edit", cache_key(instruction_key, content_hash))
+    if updated == current_content:
+        log.info(f"Instruction already applied to {slug} -- skipping edit")
+        return f"No changes: {slug}.md already has this edit"
+    if updated is None:
+        try:
+            updated = patch_article(current_content, instructions)
+        except (ValueError, json.JSONDecodeError) as e:
+            log.warning(f"Section patch not possible ({e}) -- editing full article")
+            updated = rewrite_article(current_content, instructions)
+        ai_cache.put("edit", cache_key(instruction_key, content_hash), updated)
 
+    updated = set_lastmod(updated)
     write_article(slug, updated)
+    final_hash = hashlib.sha256(updated.encode()).hexdigest()
+    ai_cache.put("edit", cache_key(instruction_key, final_hash), updated)
     return f"Updated {slug}.md"
 
 
+class CreateTracker:
+    """Progress of article generations, for logs and the dashboard.
+
+    Each create is tracked by slug with its current step and a short event
+    history; the snapshot is persisted to CREATES_FILE on every event.
+    """
+
+    def __init__(self, path: Path = CREATES_FILE, keep: int = 20):
+        self.path = path
+        self.keep = keep
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, slug: str, country_name: str):
+        with self._lock:
+            self._jobs.pop(slug, None)
+            self._jobs[slug] = {
+                "slug": slug, "country": country_name, "status": "running",
+                "step": "starting", "started": time.time(), "finished": None, "events": [],
+            }
+            self._save()
+
+    def event(self, slug: str, step: str, detail: str = ""):
+        with self._lock:
+            job = self._jobs[slug]
+            job["step"] = step
+            job["events"].append({"ts": time.time(), "step": step, "detail": detail[:200]})
+            self._save()
+        log.info(f"Create {slug}: {step}{f' -- {detail}' if detail else ''}")
+
+    def finish(self, slug: str, status: str, detail: str = ""):
+        with self._lock:
+            job = self._jobs[slug]
+            job.update(status=status, finished=time.time())
+            job["events"].append({"ts": time.time(), "step": status, "detail": detail[:200]})
+            finished = [s for s, j in self._jobs.items() if j["status"] != "running"]
+            for old in finished[:-self.keep]:
+                del self._jobs[old]
+            self._save()
+
+    def running(self) -> list[str]:
+        with self._lock:
+            return [s for s, j in self._jobs.items() if j["status"] == "running"]
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(list(self._jobs.values()), indent=2))
+        tmp.replace(self.path)
+
+
+create_tracker = CreateTracker()
+
+
+def _generator_step(line: str):
+    """Map a generate-article.js output line to a progress step, or None."""
+    marker = re.match(r"--- Step (\d+): (.*?) ---", line)
+    if marker:
+        step = GENERATOR_STEPS.get(marker.group(1), f"step {marker.group(1)}")
+        return f"{step} (skipped)" if marker.group(2).startswith("Skipping") else step
+    if line.startswith("Written to:"):
+        return "markdown written"
+    if line.startswith("=== Done! ==="):
+        return "finishing"
+    return None
+
+
+def _record_generator_usage(model: str, secs: float, usage_json: str):
+    """Account for a model request made by generate-article.js (its "Usage:" lines)."""
+    try:
+        usage = json.loads(usage_json)
+    except json.JSONDecodeError:
+        return
+    record_ai_usage(model, "ok", usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+                    secs, cost=usage.get("cost"))
+
+
+def _kill_process_group(proc: subprocess.Popen):
+    """Stop the generator and anything it spawned."""
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=5)
+    except ProcessLookupError:
+        return
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+
 def create_article(slug: str, country_name: str) -> str:
-    """Create a new article by calling the existing Node.js generator."""
+    """Create a new article by calling the existing Node.js generator.
+
+    The generator's output is streamed line by line: its step markers
+    become create_tracker progress events, and every step has its own
+    timeout (CREATE_STEP_TIMEOUTS) instead of one limit for the whole run.
+    """
     log.info(f"Creating new article: {slug} ({country_name})")
+    create_tracker.start(slug, country_name)
 
     # Source env vars so the Node script has all API keys
-    result = subprocess.run(
+    proc = subprocess.Popen(
         ["bash", "-c", f"source ~/.env && node scripts/generate-article.js {slug}"],
         cwd=str(PROJECT_DIR),
-        capture_output=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
         text=True,
-        timeout=300,
+        bufsize=1,
+        start_new_session=True,
     )
+    lines = queue.Queue()
 
-    if result.returncode != 0:
-        error_msg = result.stderr or result.stdout or "Unknown error"
-        raise RuntimeError(f"Article generation failed: {error_msg[:500]}")
+    def pump():
+        for line in proc.stdout:
+            lines.put(line.rstrip("\n"))
+        lines.put(None)
+
+    threading.Thread(target=pump, name=f"create-{slug}", daemon=True).start()
+
+    step = "starting"
+    timeout = CREATE_STEP_TIMEOUTS[step]
+    deadline = time.monotonic() + timeout
+    output = deque(maxlen=20)
+    try:
+        while True:
+            try:
+                line = lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                _kill_process_group(proc)
+                raise RuntimeError(f"Article generation timed out in step '{step}' after {timeout}s")
+            if line is None:
+                break
+            usage = re.match(r"Usage: (\S+) (\d+)ms (\{.*\})$", line)
+            if usage:
+                _record_generator_usage(usage.group(1), int(usage.group(2)) / 1000, usage.group(3))
+                continue
+            if line.strip():
+                output.append(line)
+            new_step = _generator_step(line)
+            if new_step:
+                step = new_step
+                timeout = CREATE_STEP_TIMEOUTS.get(
+                    step.removesuffix(" (skipped)"), CREATE_STEP_TIMEOUTS["starting"]
+                )
+                deadline = time.monotonic() + timeout
+                create_tracker.event(slug, step, line.strip(" -="))
+        returncode = proc.wait()
+        if returncode != 0:
+            error_msg = "\n".join(output) or "Unknown error"
+            raise RuntimeError(f"Article generation failed: {error_msg[-500:]}")
+    except Exception as e:
+        create_tracker.finish(slug, "failed", str(e))
+        raise
 
+    create_tracker.finish(slug, "done")
     log.info(f"Article created: {slug}")
     return f"Created new article: {slug}.md"
 
 # ---------------------------------------------------------------------------
-# Deploy (hugo build + git push)
+# Bulk edits (one instruction fanned out over many articles)
+# ---------------------------------------------------------------------------
+
+class RateLimiter:
+    """Spaces calls out to at most `per_minute`, across all threads."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+bulk_rate_limiter = RateLimiter(BULK_EDITS_PER_MINUTE)
+
+
+def _match_region(value: str, regions: list[str]):
+    """Region from countries.json named by `value` ("europe", "European", ...)."""
+    value = value.strip().lower()
+    for region in regions:
+        if value == region.lower() or value.startswith(region.lower()):
+            return region
+    return None
+
+
+def resolve_bulk_targets(selection: dict, slugs: list[str]) -> list[str]:
+    """Existing article slugs matching a bulk selection.
+
+    `selection` may combine "region", "tier" and an explicit "slugs" list
+    (all given criteria must hold). Countries come from data/countries.json;
+    only countries that already have an article are returned.
+    """
+    country_index._ensure_loaded()
+    countries = country_index.countries
+    regions = sorted({c["region"] for c in countries.values()})
+    candidates = [slug for slug in slugs if slug in countries]
+
+    if selection.get("slugs"):
+        wanted = {country_index.snap(s, slugs) for s in selection["slugs"]}
+        candidates = [slug for slug in slugs if slug in wanted]
+    if selection.get("region"):
+        region = _match_region(str(selection["region"]), regions)
+        candidates = [slug for slug in candidates if region and countries[slug]["region"] == region]
+    if selection.get("tier"):
+        tier = int(selection["tier"])
+        candidates = [slug for slug in candidates if countries[slug]["tier"] == tier]
+    return candidates
+
+
+def _bulk_update_one(slug: str, instructions: str, slug_lock=None) -> dict:
+    """Edit one article of a bulk job, retrying up to BULK_RETRIES times."""
+    for attempt in range(1, BULK_RETRIES + 2):
+        bulk_rate_limiter.wait()
+        try:
+            with slug_lock(slug) if slug_lock else nullcontext():
+                before = read_article(slug)
+                message = update_article(slug, instructions)
+                changed = read_article(slug) != before
+            return {"slug": slug, "status": "updated" if changed else "unchanged", "message": message}
+        except Exception as e:
+            if attempt > BULK_RETRIES:
+                log.error(f"Bulk edit of {slug} failed after {attempt} attempts: {e}")
+                return {"slug": slug, "status": "failed", "message": str(e)[:200]}
+            log.warning(f"Bulk edit of {slug} failed (attempt {attempt}): {e} -- retrying")
+            time.sleep(BULK_RETRY_DELAY * attempt)
+
+
+def bulk_update(job: dict, slug_lock=None):
+    """Apply one instruction to every slug in job["targets"].
+
+    Edits run BULK_CONCURRENCY at a time, started no faster than
+    BULK_EDITS_PER_MINUTE, each retried on its own. Fills job["bulk_results"]
+    and, when anything changed, one commit message and path list for the
+    whole batch.
+    """
+    targets = job["targets"]
+    log.info(f"Bulk update of {len(targets)} article(s): {job['summary']}")
+    context = current_ai_context()
+
+    def edit_one(slug: str) -> dict:
+        with ai_context(**context):
+            return _bulk_update_one(slug, job["details"], slug_lock)
+
+    with ThreadPoolExecutor(max_workers=BULK_CONCURRENCY, thread_name_prefix="bulk") as pool:
+        results = list(pool.map(edit_one, targets))
+
+    counts = {status: sum(r["status"] == status for r in results)
+              for status in ("updated", "unchanged", "failed")}
+    job["bulk_results"] = results
+    job["result"] = (
+        f"Updated {counts['updated']} of {len(targets)} articles "
+        f"({counts['unchanged']} unchanged, {counts['failed']} failed)"
+    )
+    log.info(f"Bulk update finished: {job['result']}")
+    if counts["updated"]:
+        job["commit_msg"] = f"email-editor: bulk update {counts['updated']} articles -- {job['summary']}"
+        job["paths"] = [path for r in results if r["status"] == "updated"
+                        for path in article_paths(r["slug"])]
+    else:
+        job["deploy_result"] = "Skipped -- no article changed"
+
 # ---------------------------------------------------------------------------
+# Hugo build checks (warm `hugo server` with periodic cold builds)
+# ---------------------------------------------------------------------------
+
+HUGO_READY = re.compile(r"Web Server is available at")
+HUGO_CHANGE = re.compile(r"^Change detected, rebuilding site")
+HUGO_DONE = re.compile(r"^(Total|Rebuilt) in \d+")
+HUGO_ERROR = re.compile(r"^(ERROR\b|Error:)|error building site")
+
+
+class HugoServer:
+    """Supervised `hugo server --renderToMemory` used as a warm build check.
+
+    Hugo watches the project and re-renders only what changed, so checking
+    an edit means waiting for the rebuild that picked up the written files
+    and collecting the errors it printed -- no cold build of every country
+    page. The process is restarted (after HUGO_RESTART_DELAY) if it dies.
+    """
+
+    def __init__(self, port: int = HUGO_SERVER_PORT):
+        self.port = port
+        self.last_full_build = 0.0
+        self._proc = None
+        self._ready = False
+        self._restart_after = 0.0
+        self._builds = deque(maxlen=50)
+        self._start_lock = threading.Lock()
+        self._cond = threading.Condition()
+
+    def ensure_running(self) -> bool:
+        """Start the server if needed and wait for its initial build. True if usable."""
+        with self._start_lock:
+            if self._proc is None or self._proc.poll() is not None:
+                if time.monotonic() < self._restart_after:
+                    return False
+                self._start()
+            deadline = time.monotonic() + HUGO_START_TIMEOUT
+            with self._cond:
+                while not self._ready and self._proc.poll() is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                return self._ready
+
+    def _start(self):
+        log.info(f"Starting hugo server (render to memory) on port {self.port}")
+        self._ready = False
+        self._restart_after = time.monotonic() + HUGO_RESTART_DELAY
+        try:
+            proc = subprocess.Popen(
+                ["hugo", "server", "--renderToMemory", "--bind", "127.0.0.1",
+                 "--port", str(self.port), "--disableLiveReload"],
+                cwd=str(PROJECT_DIR),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                start_new_session=True,
+            )
+        except OSError as e:
+            log.warning(f"Could not start hugo server: {e}")
+            return
+        self._proc = proc
+        threading.Thread(target=self._read, args=(proc,), name="hugo-server", daemon=True).start()
+
+    def _read(self, proc: subprocess.Popen):
+        initial = {"started": time.time(), "finished": None, "errors": [], "last_line": time.time()}
+        with self._cond:
+            self._builds.append(initial)
+        for line in proc.stdout:
+            line = line.strip()
+            with self._cond:
+                build = self._builds[-1]
+                if HUGO_READY.search(line):
+                    self._ready = True
+                    initial["finished"] = initial["finished"] or time.time()
+                elif HUGO_CHANGE.search(line):
+                    self._builds.append({"started": time.time(), "finished": None,
+                                         "errors": [], "last_line": time.time()})
+                elif HUGO_ERROR.search(line):
+                    build["errors"].append(line)
+                elif HUGO_DONE.search(line):
+                    build["finished"] = time.time()
+                build["last_line"] = time.time()
+                self._cond.notify_all()
+        code = proc.wait()
+        with self._cond:
+            self._ready = False
+            self._cond.notify_all()
+        log.warning(f"hugo server exited with code {code} -- restarting on next deploy")
+
+    def check(self, since: float, timeout: float = HUGO_CHECK_TIMEOUT):
+        """Error lines from the first rebuild that started at or after `since`.
+
+        An empty list means the rebuild was clean; None means no such
+        rebuild finished within `timeout` (or the server went away).
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._ready:
+                build = next((b for b in self._builds if b["started"] >= since), None)
+                if build and build["finished"]:
+                    return list(build["errors"])
+                if build and build["errors"] and time.time() - build["last_line"] >= HUGO_ERROR_SETTLE:
+                    # Failed rebuilds print errors but no timing line
+                    return list(build["errors"])
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(min(remaining, HUGO_ERROR_SETTLE))
+            return None
+
+    def stop(self):
+        if self._proc is not None and self._proc.poll() is None:
+            _kill_process_group(self._proc)
+
+
+hugo_server = HugoServer()
+atexit.register(hugo_server.stop)
+
+
+def changed_files() -> list[Path]:
+    """Paths with uncommitted changes in the project (added, modified or deleted)."""
+    result = subprocess.run(
+        ["git", "status", "--porcelain", "-z", "--untracked-files=all"],
+        cwd=str(PROJECT_DIR), capture_output=True, text=True, timeout=30,
+    )
+    entries = result.stdout.split("\0")
+    paths = []
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        i += 1
+        if len(entry) < 4:
+            continue
+        paths.append(PROJECT_DIR / entry[3:])
+        if entry[0] in "RC":
+            i += 1  # skip the rename/copy source
+    return paths
+
 
-def deploy(commit_message: str) -> str:
-    """Build with Hugo, then git add/commit/push."""
-    # Hugo build as sanity check
+def _cold_build():
+    """Full `hugo --minify` build of the whole site."""
     log.info("Running hugo build...")
     result = subprocess.run(
         ["hugo", "--minify"],
@@ -346,81 +2601,251 @@ def deploy(commit_message: str) -> str:
     )
     if result.returncode != 0:
         raise RuntimeError(f"Hugo build failed: {result.stderr[:500]}")
+    hugo_server.last_full_build = time.time()
+
+
+def build_check(changed: list[Path]):
+    """Sanity-check the site before committing. Raises RuntimeError on errors.
+
+    Uses the warm hugo server's incremental rebuild of the changed files;
+    falls back to a cold full build every HUGO_FULL_BUILD_INTERVAL seconds,
+    or whenever the server is unavailable or doesn't rebuild in time.
+    """
+    if time.time() - hugo_server.last_full_build < HUGO_FULL_BUILD_INTERVAL \
+            and hugo_server.ensure_running():
+        since = max(
+            (p if p.exists() else p.parent).stat().st_mtime
+            for p in changed if p.exists() or p.parent.exists()
+        ) if changed else time.time()
+        errors = hugo_server.check(since)
+        if errors:
+            names = [p.name for p in changed]
+            touched = [e for e in errors if any(name in e for name in names)]
+            raise RuntimeError(f"Hugo build failed: {' | '.join(touched or errors)[:500]}")
+        if errors is not None:
+            log.info(f"Hugo incremental check OK ({len(changed)} changed file(s))")
+            return
+        log.warning("hugo server did not rebuild in time -- running a full build")
+    _cold_build()
+
+# ---------------------------------------------------------------------------
+# Deploy (hugo build + git push)
+# ---------------------------------------------------------------------------
 
-    log.info("Hugo build OK. Pushing to git...")
+def _within(path: Path, roots: list[str]) -> bool:
+    relative = path.relative_to(PROJECT_DIR)
+    return any(relative == Path(root) or Path(root) in relative.parents for root in roots)
 
-    # Git add, commit, push
-    commands = [
-        ["git", "add", "-A"],
-        ["git", "commit", "-m", commit_message],
-        ["git", "push"],
-    ]
-    for cmd in commands:
+
+def _git(*args, cwd: Path = PROJECT_DIR, check: bool = True) -> subprocess.CompletedProcess:
+    """Run a git command (in the project unless `cwd` says otherwise), timed as git.<command>."""
+    with metrics.span(f"git.{args[0]}"):
         result = subprocess.run(
-            cmd,
-            cwd=str(PROJECT_DIR),
+            ["git", *args],
+            cwd=str(cwd),
             capture_output=True,
             text=True,
             timeout=60,
         )
-        if result.returncode != 0:
-            # "nothing to commit" is OK
-            if "nothing to commit" in (result.stdout + result.stderr):
-                log.info("Nothing to commit -- already up to date")
-                return "No changes to deploy"
-            raise RuntimeError(f"Git command failed ({' '.join(cmd)}): {result.stderr[:300]}")
+    if check and result.returncode != 0:
+        raise RuntimeError(f"Git command failed (git {' '.join(args)}): {result.stderr[:300]}")
+    return result
+
 
-    log.info("Deployed successfully")
-    return "Deployed to GitHub Pages"
+def _rebase_onto_upstream():
+    """Rebase local commits onto whatever the generate workflow pushed.
+
+    Other jobs keep writing articles and data/queue.json while a deploy
+    runs, so the live tree is never stashed or reset for the rebase: it
+    happens in DEPLOY_WORKTREE, a scratch checkout of its own. The live
+    branch then moves onto the result with `reset --keep`, which rewrites
+    only the files upstream changed and refuses if one of them has
+    uncommitted edits.
+    """
+    _git("fetch")
+    if _git("merge-base", "--is-ancestor", "@{u}", "HEAD", check=False).returncode == 0:
+        return  # nothing new upstream
+    head = _git("rev-parse", "HEAD").stdout.strip()
+    upstream = _git("rev-parse", "@{u}").stdout.strip()
+    if (DEPLOY_WORKTREE / ".git").exists():
+        _git("rebase", "--abort", cwd=DEPLOY_WORKTREE, check=False)  # left by a crash
+        _git("checkout", "--force", "--detach", head, cwd=DEPLOY_WORKTREE)
+    else:
+        _git("worktree", "prune")
+        _git("worktree", "add", "--detach", str(DEPLOY_WORKTREE), head)
+    if _git("rebase", upstream, cwd=DEPLOY_WORKTREE, check=False).returncode != 0:
+        _git("rebase", "--abort", cwd=DEPLOY_WORKTREE, check=False)
+        raise RuntimeError("Git rebase onto upstream hit a conflict -- resolve it by hand")
+    _git("reset", "--keep", _git("rev-parse", "HEAD", cwd=DEPLOY_WORKTREE).stdout.strip())
+
+
+def deploy(commit_message: str, paths: list[str] = None) -> str:
+    """Check the build with Hugo, then git add/commit/push.
+
+    Only changes under `paths` (project-relative files or directories) are
+    staged and committed, so files other jobs are still writing -- a create
+    halfway through its images, another article mid-edit -- stay out of the
+    commit, and the rebase before the push never touches them (see
+    _rebase_onto_upstream). paths=None deploys the whole tree. Holds
+    DEPLOY_LOCK_FILE throughout, so editor instances sharing the checkout
+    never build, commit or push at the same time.
+    """
+    with file_lock(DEPLOY_LOCK_FILE):
+        # Hugo build as sanity check (nothing changed -> nothing to check)
+        changed = changed_files()
+        if paths is not None:
+            changed = [path for path in changed if _within(path, paths)]
+        if changed:
+            with metrics.span("hugo.check"):
+                build_check(changed)
+
+        log.info("Hugo build OK. Pushing to git...")
+        nothing_to_commit = False
+
+        # Git add, commit, then rebase and push -- a push left over from an
+        # earlier attempt that committed but failed to push goes out too
+        if paths is None:
+            _git("add", "-A")
+            pathspec = []
+        elif changed:
+            pathspec = ["--"] + [str(path.relative_to(PROJECT_DIR)) for path in changed]
+            _git("add", "-A", *pathspec)
+        if paths is None or changed:
+            result = _git("commit", "-m", commit_message, *pathspec, check=False)
+            if result.returncode != 0:
+                if "nothing to commit" not in (result.stdout + result.stderr):
+                    raise RuntimeError(f"Git command failed (git commit): {result.stderr[:300]}")
+                nothing_to_commit = True
+        else:
+            nothing_to_commit = True
+        if nothing_to_commit:
+            log.info("Nothing to commit -- already up to date")
+        _rebase_onto_upstream()
+        _git("push")
+
+        if nothing_to_commit:
+            return "No changes to deploy"
+        log.info("Deployed successfully")
+        return "Deployed to GitHub Pages"
+
+
+class DeployCoalescer:
+    """Batches finished edits into one hugo build, one commit and one push.
+
+    submit() hands back a Future; a background thread waits up to
+    DEPLOY_WINDOW seconds after the first pending change (or until
+    DEPLOY_MAX_BATCH changes are waiting), deploys the union of their
+    paths once with a commit message listing every change, and resolves
+    all the Futures with the shared result.
+    """
+
+    def __init__(self, window: float = DEPLOY_WINDOW, max_batch: int = DEPLOY_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop, name="deployer", daemon=True).start()
+
+    def submit(self, commit_message: str, paths: list[str] = None) -> Future:
+        future = Future()
+        with self._cond:
+            self._pending.append((commit_message, paths, future))
+            self._cond.notify()
+        return future
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                self._pending = self._pending[self.max_batch:]
+            self._deploy(batch)
+
+    def _deploy(self, batch: list):
+        # Emails whose instructions were combined into one edit share a message
+        messages = list(dict.fromkeys(message for message, _, _ in batch))
+        paths = None
+        if all(job_paths is not None for _, job_paths, _ in batch):
+            paths = sorted({path for _, job_paths, _ in batch for path in job_paths})
+        if len(messages) == 1:
+            commit_message = messages[0]
+        else:
+            changes = "\n".join(f"- {m.removeprefix('email-editor: ')}" for m in messages)
+            commit_message = f"email-editor: {len(messages)} changes\n\n{changes}"
+        log.info(f"Deploying batch of {len(messages)} change(s)")
+        metrics.inc("deploys_total")
+        metrics.inc("deployed_changes_total", len(messages))
+        try:
+            with metrics.span("deploy"):
+                result = deploy(commit_message, paths)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        if len(messages) > 1:
+            result = f"{result} (batched with {len(messages) - 1} other change(s))"
+        for _, _, future in batch:
+            future.set_result(result)
 
 # ---------------------------------------------------------------------------
-# Process a single email
+# Processing stages (classify -> edit -> deploy -> reply)
 # ---------------------------------------------------------------------------
 
-def process_email(email_data: dict) -> str:
-    """Process one email: classify -> act -> deploy -> reply."""
-    subject = email_data["subject"]
-    body = email_data["body"]
+def classify_stage(job: dict):
+    """Classify the email and decide on an action (or a clarification)."""
+    subject = job["email"]["subject"]
+    body = job["email"]["body"]
     full_instructions = f"{subject}\n{body}".strip()
 
     log.info(f"Processing email: {subject}")
 
-    # Step 1: Classify intent
     slugs = get_article_slugs()
     intent = classify_intent(subject, body, slugs)
     action = intent.get("action", "unknown")
     target_slug = intent.get("target_slug", "")
-    country_name = intent.get("country_name", target_slug.replace("-", " ").title())
-    details = intent.get("details", full_instructions)
-    summary = intent.get("summary", subject)
+    job.update({
+        "action": action,
+        "target_slug": target_slug,
+        "country_name": intent.get("country_name", target_slug.replace("-", " ").title()),
+        "details": intent.get("details", full_instructions),
+        "summary": intent.get("summary", subject),
+    })
 
-    log.info(f"Intent: action={action}, slug={target_slug}, summary={summary}")
+    log.info(f"Intent: action={action}, slug={target_slug}, summary={job['summary']}")
 
-    # Step 2: Execute action
     if action == "update_article":
         if target_slug not in slugs:
-            return send_clarification(
-                subject,
+            job["clarification"] = (
                 f"I couldn't find an article with slug '{target_slug}'. "
                 f"Available articles: {', '.join(slugs)}. "
                 "Could you clarify which article to update?"
             )
-        result = update_article(target_slug, details)
-        commit_msg = f"email-editor: update {target_slug} -- {summary}"
-
+    elif action == "bulk_update":
+        job["targets"] = resolve_bulk_targets(intent.get("targets") or {}, slugs)
+        if not job["targets"]:
+            job["clarification"] = (
+                f"I couldn't match any existing articles for that bulk edit "
+                f"(selection: {json.dumps(intent.get('targets') or {})}). "
+                f"Regions: {', '.join(country_index.regions())}. "
+                "Could you say which region, tier or articles you mean?"
+            )
+        else:
+            log.info(f"Bulk targets ({len(job['targets'])}): {', '.join(job['targets'])}")
     elif action == "create_article":
         if target_slug in slugs:
-            return send_clarification(
-                subject,
+            job["clarification"] = (
                 f"Article '{target_slug}' already exists. "
                 "Did you mean to update it instead? Please clarify."
             )
-        result = create_article(target_slug, country_name)
-        commit_msg = f"email-editor: create {target_slug}"
-
     elif action == "unknown":
-        return send_clarification(
-            subject,
+        job["clarification"] = (
             f"I wasn't sure what to do with your request:\n\n"
             f"Subject: {subject}\n{body}\n\n"
             "Could you rephrase? I can:\n"
@@ -428,23 +2853,181 @@ def process_email(email_data: dict) -> str:
             "- Create a new article (e.g., 'Create an article about France')"
         )
     else:
-        return send_clarification(subject, f"Unknown action: {action}")
+        job["clarification"] = f"Unknown action: {action}"
+
+
+def edit_stage(job: dict, slug_lock=None):
+    """Apply the classified action to the article(s) on disk."""
+    if "clarification" in job:
+        return
+    if job["action"] == "bulk_update":
+        bulk_update(job, slug_lock)
+        return
+    slug = job["target_slug"]
+    if job["action"] == "update_article":
+        job.update(apply_updates(slug, [(job["details"], job["summary"])]))
+    else:
+        job["result"] = create_article(slug, job["country_name"])
+        job["commit_msg"] = f"email-editor: create {slug}"
+        job["paths"] = created_paths(slug)
+
+
+def apply_updates(slug: str, updates: list) -> dict:
+    """Apply (instructions, summary) pairs to one article as a single edit.
+
+    Returns the job fields for every email involved: "result", plus
+    "commit_msg" and "paths", or "deploy_result" when the article did not
+    change.
+    """
+    before = read_article(slug)
+    result = update_article(slug, combine_instructions([text for text, _ in updates]))
+    if len(updates) > 1:
+        result = f"{result} (one edit for {len(updates)} instructions)"
+    if read_article(slug) == before:
+        return {"result": result, "deploy_result": "Skipped -- article unchanged"}
+    summary = "; ".join(summary for _, summary in updates)
+    return {"result": result, "commit_msg": f"email-editor: update {slug} -- {summary}",
+            "paths": article_paths(slug)}
+
+
+class EditCoalescer:
+    """Merges update instructions for the same article into one AI edit.
+
+    submit() hands back a Future of the job fields apply_updates() returns.
+    The first instruction for a slug opens a window of EDIT_WINDOW seconds
+    (cut short once EDIT_MAX_BATCH are waiting) for more instructions for
+    that article; then one apply_updates() call for all of them is handed
+    to `run` (the pipeline's scheduler) and made under the article lock,
+    and every Future resolves with the shared outcome, or its exception.
+    Nothing blocks while the window is open. A burst of emails about one
+    article costs one read, one model edit and one deploy instead of one
+    each.
+    """
+
+    def __init__(self, window: float = EDIT_WINDOW, max_batch: int = EDIT_MAX_BATCH, run=None):
+        self.window = window
+        self.max_batch = max_batch
+        self.run = run or (lambda fn, *args: threading.Thread(target=fn, args=args, daemon=True).start())
+        self._pending = {}          # slug -> {"deadline", "items", "slug_lock", "ai_context"}
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop, name="edit-coalescer", daemon=True).start()
+
+    def submit(self, slug: str, instructions: str, summary: str, slug_lock=None) -> Future:
+        future = Future()
+        with self._cond:
+            batch = self._pending.setdefault(slug, {
+                "deadline": time.monotonic() + self.window, "items": [], "slug_lock": slug_lock,
+                "ai_context": current_ai_context(),   # the model call is accounted to the first email
+            })
+            batch["items"].append((instructions, summary, future))
+            full = len(batch["items"]) >= self.max_batch
+            if full:
+                del self._pending[slug]
+            else:
+                self._cond.notify()
+        if full:
+            self.run(self._edit, slug, batch)
+        return future
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                due = [slug for slug, batch in self._pending.items() if batch["deadline"] <= now]
+                if not due:
+                    deadline = min((batch["deadline"] for batch in self._pending.values()), default=None)
+                    self._cond.wait(None if deadline is None else deadline - now)
+                    continue
+                ready = [(slug, self._pending.pop(slug)) for slug in due]
+            for slug, batch in ready:
+                self.run(self._edit, slug, batch)
+
+    def _edit(self, slug: str, batch: dict):
+        items = batch["items"]
+        if len(items) > 1:
+            log.info(f"Combining {len(items)} instructions for {slug} into one edit")
+            metrics.inc("coalesced_instructions_total", len(items) - 1)
+        try:
+            with batch["slug_lock"](slug) if batch["slug_lock"] else nullcontext(), \
+                    ai_context(**batch["ai_context"]):
+                outcome = apply_updates(slug, [(text, summary) for text, summary, _ in items])
+        except BaseException as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        for _, _, future in items:
+            future.set_result(outcome)
 
-    # Step 3: Deploy
-    deploy_result = deploy(commit_msg)
 
-    # Step 4: Reply with confirmation
-    article_url = f"{SITE_URL}/countries/{target_slug}/"
+def deploy_stage(job: dict):
+    """Build and push the edited article."""
+    if "clarification" in job or "commit_msg" not in job:
+        return
+    job["deploy_result"] = deploy(job["commit_msg"], job.get("paths"))
+
+
+def reply_stage(job: dict):
+    """Reply with a confirmation or a clarification request."""
+    subject = job["email"]["subject"]
+    if "clarification" in job:
+        job["result"] = send_clarification(subject, job["clarification"])
+        return
+
+    if job["action"] == "bulk_update":
+        send_reply(ALLOWED_SENDER, f"Re: {subject}", bulk_reply_body(job))
+        return
+
+    article_url = f"{SITE_URL}/countries/{job['target_slug']}/"
     reply_body = (
         f"Done! Here's what I did:\n\n"
-        f"Action: {summary}\n"
-        f"Result: {result}\n"
-        f"Deploy: {deploy_result}\n\n"
+        f"Action: {job['summary']}\n"
+        f"Result: {job['result']}\n"
+        f"Deploy: {job['deploy_result']}\n\n"
         f"View it here: {article_url}\n\n"
         f"(Note: GitHub Pages may take 1-2 minutes to update.)"
     )
     send_reply(ALLOWED_SENDER, f"Re: {subject}", reply_body)
-    return result
+
+
+def bulk_reply_body(job: dict) -> str:
+    """Summary reply for a bulk update: what changed, what didn't, what failed."""
+    lines = [
+        "Done! Here's what I did:\n",
+        f"Action: {job['summary']}",
+        f"Result: {job['result']}",
+        f"Deploy: {job['deploy_result']}",
+    ]
+    headings = {"updated": "Updated", "unchanged": "Already up to date", "failed": "Failed"}
+    for status, heading in headings.items():
+        rows = [r for r in job["bulk_results"] if r["status"] == status]
+        if not rows:
+            continue
+        lines.append(f"\n{heading} ({len(rows)}):")
+        for r in rows:
+            if status == "failed":
+                lines.append(f"- {country_index.name(r['slug'])}: {r['message']}")
+            else:
+                lines.append(f"- {country_index.name(r['slug'])}: {SITE_URL}/countries/{r['slug']}/")
+    lines.append("\n(Note: GitHub Pages may take 1-2 minutes to update.)")
+    return "\n".join(lines)
+
+
+def ai_action(stage: str, job: dict) -> str:
+    """Action an AI call is accounted to: classify, update, bulk_update or create."""
+    if stage == "classify":
+        return "classify"
+    action = job.get("action", stage)
+    return {"update_article": "update", "create_article": "create"}.get(action, action)
+
+
+def process_email(email_data: dict) -> str:
+    """Process one email synchronously: classify -> edit -> deploy -> reply."""
+    job = {"email": email_data}
+    for name, stage in (("classify", classify_stage), ("edit", edit_stage),
+                        ("deploy", deploy_stage), ("reply", reply_stage)):
+        with metrics.span(f"stage.{name}"), ai_context(action=ai_action(name, job)):
+            stage(job)
+    return job["result"]
 
 
 def send_clarification(original_subject: str, message: str) -> str:
@@ -457,12 +3040,725 @@ def send_clarification(original_subject: str, message: str) -> str:
     log.info("Sent clarification request")
     return "Sent clarification"
 
+
+def send_error_reply(error: Exception):
+    """Tell the sender that processing failed. Never raises."""
+    try:
+        send_reply(
+            ALLOWED_SENDER,
+            "Email Editor Error",
+            f"Something went wrong processing your email:\n\n{error}\n\n"
+            "Please try again or check the logs."
+        )
+    except Exception:
+        pass
+
+# ---------------------------------------------------------------------------
+# Cluster coordination (instances sharing STATE_DIR)
+# ---------------------------------------------------------------------------
+
+class LeaseLost(RuntimeError):
+    """This instance's lease on a job ran out and another instance took it over."""
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Exclusive flock(2) on `path`, shared by every process on the checkout."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def owner_dead(owner: str) -> bool:
+    """True if `owner` (an INSTANCE_ID) is a process on this host that has exited.
+
+    Instances on other hosts can't be checked; their leases simply expire.
+    """
+    host, _, pid = (owner or "").rpartition(":")
+    if not owner:
+        return True
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+# ---------------------------------------------------------------------------
+# Job journal (durable per-email processing state)
+# ---------------------------------------------------------------------------
+
+class JobJournal:
+    """SQLite record of every ingested email and how far it got.
+
+    The IMAP reader append()s a job once per Message-ID; workers claim()
+    it (a conditional UPDATE, so only one claimant wins), persist the job
+    dict after each stage, and complete() or fail() it. A failed job is
+    re-queued with backoff up to JOB_MAX_ATTEMPTS and resumes after its
+    last finished stage, so e.g. a failed deploy does not redo the AI
+    edit.
+
+    The database may be shared by several editor instances. A claimed job
+    is leased to INSTANCE_ID until `lease_until`; renew_leases() extends
+    every lease this instance holds. A running job whose lease expired, or
+    whose owner is a dead process on this host, is due again and can be
+    claimed by any instance, and writes by the old owner are then refused
+    (LeaseLost). lease() holds a named lease -- used per article -- the
+    same way.
+    """
+
+    def __init__(self, path: Path = JOBS_DB_FILE):
+        self.path = path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, message_id TEXT UNIQUE,"
+                " uidvalidity INTEGER, uid INTEGER,"
+                " state TEXT, stage TEXT, attempts INTEGER, not_before REAL,"
+                " job TEXT, timings TEXT, result TEXT, error TEXT,"
+                " created REAL, updated REAL, finished REAL,"
+                " owner TEXT, lease_until REAL)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, not_before)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT, expires REAL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS instances (id TEXT PRIMARY KEY, started REAL, heartbeat REAL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def append(self, uidvalidity, uid: bytes, email_data: dict):
+        """Journal a newly fetched email. Returns the job id, or None if its
+        Message-ID was already journaled."""
+        message_id = email_data.get("message_id") or f"<uid-{uidvalidity}-{int(uid)}>"
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO jobs (message_id, uidvalidity, uid, state, stage,"
+                " attempts, not_before, job, timings, created, updated)"
+                " VALUES (?, ?, ?, 'queued', '', 0, 0, ?, '{}', ?, ?)",
+                (message_id, uidvalidity, int(uid),
+                 json.dumps({"uid": uid.decode(), "email": email_data}), now, now),
+            )
+            db.commit()
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def known_uids(self, uidvalidity, uids: list) -> set:
+        """The subset of `uids` that already have a job."""
+        if not uids:
+            return set()
+        with self._lock:
+            rows = self._conn().execute(
+                f"SELECT uid FROM jobs WHERE uidvalidity = ? AND uid IN ({','.join('?' * len(uids))})",
+                (uidvalidity, *[int(uid) for uid in uids]),
+            ).fetchall()
+        found = {row[0] for row in rows}
+        return {uid for uid in uids if int(uid) in found}
+
+    def recover(self) -> int:
+        """Re-queue jobs whose owner is gone: a dead process on this host
+        (e.g. the previous run of this service) or an expired lease.
+        Returns how many."""
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO instances (id, started, heartbeat) VALUES (?, ?, ?)",
+                (INSTANCE_ID, now, now),
+            )
+            rows = db.execute(
+                "SELECT id, owner, lease_until FROM jobs WHERE state = 'running' AND owner IS NOT ?",
+                (INSTANCE_ID,),
+            ).fetchall()
+            stale = [job_id for job_id, owner, until in rows
+                     if (until or 0) < now or owner_dead(owner)]
+            for job_id in stale:
+                db.execute(
+                    "UPDATE jobs SET state = 'queued', not_before = 0, owner = NULL, updated = ?"
+                    " WHERE id = ? AND state = 'running'",
+                    (now, job_id),
+                )
+            db.commit()
+        return len(stale)
+
+    def due(self) -> list:
+        """Ids of jobs ready to claim, oldest first: queued ones whose retry
+        time has come, and running ones abandoned by their owner."""
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            queued = db.execute(
+                "SELECT id FROM jobs WHERE state = 'queued' AND not_before <= ? ORDER BY id",
+                (now,),
+            ).fetchall()
+            running = db.execute(
+                "SELECT id, owner, lease_until FROM jobs WHERE state = 'running' AND owner IS NOT ?",
+                (INSTANCE_ID,),
+            ).fetchall()
+        abandoned = [job_id for job_id, owner, until in running
+                     if (until or 0) < now or owner_dead(owner)]
+        return sorted([row[0] for row in queued] + abandoned)
+
+    def claim(self, job_id: int):
+        """Lease a due job to this instance. Returns its record, or None if
+        another instance holds it, or it is finished or not yet due."""
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            row = db.execute(
+                "SELECT state, not_before, owner, lease_until FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            state, not_before, owner, lease_until = row
+            if state == "queued" and not_before <= now:
+                condition, args = "state = 'queued'", ()
+            elif state == "running" and owner != INSTANCE_ID and (
+                    (lease_until or 0) < now or owner_dead(owner)):
+                # Compare-and-swap on the old lease so only one instance takes over
+                condition, args = "state = 'running' AND owner IS ? AND lease_until IS ?", (owner, lease_until)
+                log.warning(f"Taking over job {job_id} from {owner or 'unknown owner'} (lease expired)")
+                metrics.inc("job_takeovers_total")
+            else:
+                return None
+            cursor = db.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, owner = ?,"
+                f" lease_until = ?, updated = ? WHERE id = ? AND {condition}",
+                (INSTANCE_ID, now + LEASE_TTL, now, job_id, *args),
+            )
+            db.commit()
+            if not cursor.rowcount:
+                return None
+            row = db.execute(
+                "SELECT uidvalidity, uid, stage, attempts, job, timings FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        return {
+            "id": job_id, "uidvalidity": row[0], "uid": row[1], "stage": row[2],
+            "attempts": row[3], "job": json.loads(row[4]), "timings": json.loads(row[5]),
+        }
+
+    def _update_owned(self, job_id: int, assignments: str, args: tuple) -> bool:
+        """UPDATE a job only while this instance holds it. False if it doesn't any more."""
+        with self._lock:
+            db = self._conn()
+            cursor = db.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND state = 'running' AND owner = ?",
+                (*args, job_id, INSTANCE_ID),
+            )
+            db.commit()
+        return bool(cursor.rowcount)
+
+    def finish_stage(self, job_id: int, stage: str, job: dict, timings: dict):
+        """Persist the job dict once `stage` has completed. Raises LeaseLost."""
+        now = time.time()
+        if not self._update_owned(
+            job_id, "stage = ?, job = ?, timings = ?, lease_until = ?, updated = ?",
+            (stage, json.dumps(job), json.dumps(timings), now + LEASE_TTL, now),
+        ):
+            raise LeaseLost(f"job {job_id} was taken over by another instance")
+
+    def complete(self, job_id: int, result: str):
+        """Mark the job done. Raises LeaseLost."""
+        now = time.time()
+        if not self._update_owned(
+            job_id, "state = 'done', result = ?, error = NULL, owner = NULL, updated = ?, finished = ?",
+            (result, now, now),
+        ):
+            raise LeaseLost(f"job {job_id} was taken over by another instance")
+
+    def fail(self, job_id: int, error: str, retry_in: float = None) -> bool:
+        """Record a failure; re-queue after `retry_in` seconds, or give up.
+        False if another instance has taken the job over meanwhile."""
+        now = time.time()
+        if retry_in is None:
+            return self._update_owned(
+                job_id, "state = 'failed', error = ?, owner = NULL, updated = ?, finished = ?",
+                (error, now, now),
+            )
+        return self._update_owned(
+            job_id, "state = 'queued', error = ?, owner = NULL, not_before = ?, updated = ?",
+            (error, now + retry_in, now),
+        )
+
+    def renew_leases(self) -> int:
+        """Extend every job and named lease this instance holds. Returns the
+        number of running jobs renewed."""
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            cursor = db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE state = 'running' AND owner = ?",
+                (now + LEASE_TTL, INSTANCE_ID),
+            )
+            db.execute("UPDATE leases SET expires = ? WHERE owner = ?", (now + LEASE_TTL, INSTANCE_ID))
+            db.execute(
+                "INSERT OR REPLACE INTO instances (id, started, heartbeat) VALUES"
+                " (?, COALESCE((SELECT started FROM instances WHERE id = ?), ?), ?)",
+                (INSTANCE_ID, INSTANCE_ID, now, now),
+            )
+            db.commit()
+            return cursor.rowcount
+
+    def instances(self) -> list:
+        """INSTANCE_IDs with a heartbeat within the last LEASE_TTL seconds."""
+        with self._lock:
+            rows = self._conn().execute(
+                "SELECT id FROM instances WHERE heartbeat >= ? ORDER BY id", (time.time() - LEASE_TTL,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _try_lease(self, name: str) -> bool:
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            cursor = db.execute(
+                "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires"
+                " WHERE leases.expires < ? OR leases.owner = ?",
+                (name, INSTANCE_ID, now + LEASE_TTL, now, INSTANCE_ID),
+            )
+            if not cursor.rowcount:
+                holder = db.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+                if holder and owner_dead(holder[0]):
+                    db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, holder[0]))
+            db.commit()
+            return bool(cursor.rowcount)
+
+    @contextmanager
+    def lease(self, name: str):
+        """Hold the named lease (waiting while another instance has it)."""
+        waited = False
+        while not self._try_lease(name):
+            if not waited:
+                log.info(f"Waiting for {name} -- held by another instance")
+                waited = True
+            time.sleep(LEASE_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            with self._lock:
+                db = self._conn()
+                db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, INSTANCE_ID))
+                db.commit()
+
+    def stats(self) -> str:
+        """Job counts by state, e.g. 'done 12, queued 1'."""
+        with self._lock:
+            rows = self._conn().execute(
+                "SELECT state, COUNT(*) FROM jobs GROUP BY state ORDER BY state"
+            ).fetchall()
+        return ", ".join(f"{state} {count}" for state, count in rows) or "no jobs yet"
+
+
+job_journal = JobJournal()
+
+# ---------------------------------------------------------------------------
+# Priority lanes (interactive edits ahead of batch work)
+# ---------------------------------------------------------------------------
+
+class LaneScheduler:
+    """Priority lanes over one set of worker threads.
+
+    submit(lane, fn, *args) queues a call in a lane. Lanes are served in
+    LANES order: a free worker always starts the oldest job of the first
+    lane that is under its worker limit, so interactive jobs never queue
+    behind batch jobs. A lane whose oldest job has waited past its target
+    may also borrow a worker that later lanes leave idle. Queue depth,
+    running count and wait times go to the metrics (lane_* gauges and the
+    lane.<name>.wait span); a start later than the target is counted in
+    lane_target_missed_total.
+    """
+
+    def __init__(self, lanes: dict = None):
+        lanes = lanes or LANES
+        self.lanes = {
+            name: {"limit": cfg["workers"], "target": cfg["target"], "queue": deque(), "running": 0}
+            for name, cfg in lanes.items()
+        }
+        self.order = list(self.lanes)
+        self._cond = threading.Condition()
+        for i in range(sum(lane["limit"] for lane in self.lanes.values())):
+            threading.Thread(target=self._work, name=f"worker-{i + 1}", daemon=True).start()
+        for name in self.order:
+            self._publish(name)
+
+    def submit(self, lane: str, fn, *args):
+        with self._cond:
+            self.lanes[lane]["queue"].append((time.monotonic(), fn, args))
+            self._publish(lane)
+            self._cond.notify()
+
+    def _pick(self, now: float):
+        """(lane to start next, or None; seconds until a waiting job may borrow)."""
+        idle = sum(lane["limit"] - lane["running"] for lane in self.lanes.values())
+        borrow_in = None
+        for index, name in enumerate(self.order):
+            lane = self.lanes[name]
+            if not lane["queue"]:
+                continue
+            if lane["running"] < lane["limit"]:
+                return name, None
+            later = [self.lanes[n] for n in self.order[index + 1:]]
+            spare = sum(max(0, n["limit"] - n["running"]) for n in later if not n["queue"])
+            if idle > 0 and spare > 0:
+                overdue = lane["queue"][0][0] + lane["target"] - now
+                if overdue <= 0:
+                    return name, None
+                borrow_in = overdue if borrow_in is None else min(borrow_in, overdue)
+        return None, borrow_in
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    name, borrow_in = self._pick(time.monotonic())
+                    if name:
+                        break
+                    self._cond.wait(borrow_in)
+                lane = self.lanes[name]
+                queued, fn, args = lane["queue"].popleft()
+                lane["running"] += 1
+                self._publish(name)
+            waited = time.monotonic() - queued
+            metrics.observe(f"lane.{name}.wait", waited)
+            if waited > lane["target"]:
+                metrics.inc("lane_target_missed_total", lane=name)
+                log.warning(f"{name} job started after {waited:.1f}s (target {lane['target']}s)")
+            try:
+                fn(*args)
+            except Exception as e:
+                log.error(f"Unhandled error in {name} job: {e}")
+            finally:
+                with self._cond:
+                    lane["running"] -= 1
+                    self._publish(name)
+                    self._cond.notify_all()
+
+    def _publish(self, name: str):
+        lane = self.lanes[name]
+        metrics.gauge("lane_queue_depth", len(lane["queue"]), lane=name)
+        metrics.gauge("lane_running", lane["running"], lane=name)
+        metrics.gauge("lane_workers", lane["limit"], lane=name)
+        metrics.gauge("lane_target_seconds", lane["target"], lane=name)
+
+    def stats(self) -> dict:
+        """{lane: {"queued", "running", "workers", "target", "oldest_wait"}}."""
+        now = time.monotonic()
+        with self._cond:
+            return {
+                name: {
+                    "queued": len(lane["queue"]),
+                    "running": lane["running"],
+                    "workers": lane["limit"],
+                    "target": lane["target"],
+                    "oldest_wait": round(now - lane["queue"][0][0], 1) if lane["queue"] else 0.0,
+                }
+                for name, lane in self.lanes.items()
+            }
+
+
+def job_lane(job: dict) -> str:
+    """Lane for the rest of a classified job: batch for article creation and bulk edits."""
+    if "clarification" not in job and job.get("action") in ("create_article", "bulk_update"):
+        return "batch"
+    return "interactive"
+
+# ---------------------------------------------------------------------------
+# Concurrent pipeline (worker pool with per-article locking)
+# ---------------------------------------------------------------------------
+
+class EmailPipeline:
+    """Runs emails through the processing stages on a worker pool.
+
+    Emails for different slugs are edited in parallel; a per-slug lock keeps
+    two edits of the same article from racing, and deploys (hugo + git) are
+    serialized. Every email is a JobJournal entry: submit() journals it,
+    workers claim it and record progress stage by stage, and failures are
+    retried from the last finished stage. The IMAP connection stays on the
+    main thread: workers report finished UIDs back through collect(), and
+    write to a pipe so the main loop can wake out of IDLE to mark them
+    seen. Updates go through an EditCoalescer and deploys through a
+    DeployCoalescer, so a burst of instructions for one article costs one
+    model edit, and a burst of edits one build and one push; a job waiting
+    on either gives its worker back.
+
+    Jobs run on a LaneScheduler: every email starts in the interactive
+    lane, and once classified, article creation and bulk edits continue
+    from their edit stage in the batch lane, so a quick update never waits
+    behind a generation that takes minutes.
+
+    Several pipelines (editor processes) can share one journal: the
+    article lock is also a journal lease, a heartbeat thread renews this
+    instance's leases, and jobs abandoned by a crashed instance become
+    due here once their lease runs out.
+    """
+
+    def __init__(self, workers: int = WORKER_POOL_SIZE, journal: JobJournal = None):
+        self.workers = workers
+        lanes = {name: dict(cfg) for name, cfg in LANES.items()}
+        lanes["interactive"]["workers"] = workers
+        self.lanes = LaneScheduler(lanes)
+        self._slug_locks = {}
+        self._slug_locks_guard = threading.Lock()
+        self._editor = EditCoalescer(run=lambda fn, *args: self.lanes.submit("interactive", fn, *args))
+        self._deployer = DeployCoalescer()
+        self.stages = (
+            ("classify", classify_stage),
+            ("edit", self._edit_stage),
+            ("deploy", self._deploy_stage),
+            ("reply", reply_stage),
+        )
+        self.journal = journal or job_journal
+        self._in_flight = set()
+        self._done = queue.Queue()
+        self._completed_at = deque()
+        self._last_report = time.monotonic()
+        self.wake_fd, self._wake_w = os.pipe()
+        os.set_blocking(self.wake_fd, False)
+        threading.Thread(target=self._keep_leases, name="lease-keeper", daemon=True).start()
+
+    def submit(self, uidvalidity, uid: bytes, email_data: dict) -> bool:
+        """Journal an email and queue it. False if it was already journaled."""
+        job_id = self.journal.append(uidvalidity, uid, email_data)
+        if job_id is None:
+            return False
+        self._start(job_id)
+        return True
+
+    def dispatch(self):
+        """Start journaled jobs that are due: retries and leftovers from a previous run."""
+        for job_id in self.journal.due():
+            if job_id not in self._in_flight:
+                self._start(job_id)
+
+    def _start(self, job_id: int):
+        self._in_flight.add(job_id)
+        self.lanes.submit("interactive", self._run, job_id)
+
+    @contextmanager
+    def slug_lock(self, slug: str):
+        """Hold an article against other workers here and other instances."""
+        with self._slug_locks_guard:
+            local = self._slug_locks.setdefault(slug, threading.Lock())
+        with local, self.journal.lease(f"article:{slug}"):
+            yield
+
+    def _keep_leases(self):
+        """Heartbeat: renew this instance's leases, and wake the main loop
+        when jobs are due (retries, or work abandoned by another instance)."""
+        while True:
+            time.sleep(LEASE_RENEW_INTERVAL)
+            try:
+                self.journal.renew_leases()
+                if self.journal.due():
+                    os.write(self._wake_w, b"\0")
+            except Exception as e:
+                log.warning(f"Lease renewal failed: {e}")
+
+    def _edit_stage(self, job: dict):
+        if job.get("action") == "bulk_update":
+            # Bulk edits take each article's lock as they go
+            edit_stage(job, slug_lock=self.slug_lock)
+            return
+        if job.get("action") == "update_article" and "clarification" not in job:
+            return self._editor.submit(job["target_slug"], job["details"], job["summary"],
+                                       slug_lock=self.slug_lock)
+        with self.slug_lock(job.get("target_slug", "")):
+            edit_stage(job)
+
+    def _deploy_stage(self, job: dict):
+        if "clarification" in job or "commit_msg" not in job:
+            return None
+        deployed = Future()
+
+        def done(future: Future):
+            try:
+                deployed.set_result({"deploy_result": future.result()})
+            except Exception as e:
+                deployed.set_exception(e)
+
+        self._deployer.submit(job["commit_msg"], job.get("paths")).add_done_callback(done)
+        return deployed
+
+    def _run(self, job_id: int):
+        record = self.journal.claim(job_id)
+        if record is None:
+            self._finish(job_id, None)
+            return
+        uid = record["job"]["uid"]
+        names = [name for name, _ in self.stages]
+        resume_at = names.index(record["stage"]) + 1 if record["stage"] else 0
+        if resume_at:
+            log.info(f"Resuming UID {uid} after its {record['stage']} stage "
+                     f"(attempt {record['attempts']})")
+        self._execute(job_id, record, resume_at)
+
+    def _execute(self, job_id: int, record: dict, start: int, lane: str = "interactive",
+                 waiting: tuple = None):
+        """Run stages from index `start` in `lane`, then complete or fail the job.
+
+        A stage that waits on a coalescer (edit, deploy) returns a Future of
+        job fields instead of holding its worker; when it resolves the job
+        is queued again with `waiting` = (future, started) and carries on
+        from that stage. What is left after a wait is quick, so it always
+        continues in the interactive lane, even for a create.
+        """
+        job, timings = record["job"], record["timings"]
+        uid = job["uid"]
+        seen = (record["uidvalidity"], uid.encode())
+        handed_off = False
+        name = None
+        try:
+            for index in range(start, len(self.stages)):
+                name, stage = self.stages[index]
+                if waiting:
+                    pending, started = waiting
+                    waiting = None
+                else:
+                    if name == "edit" and job_lane(job) != lane:
+                        log.info(f"UID {uid}: {job['action']} continues in the {job_lane(job)} lane")
+                        self.lanes.submit(job_lane(job), self._execute, job_id, record, index, job_lane(job))
+                        handed_off = True
+                        return
+                    started = time.monotonic()
+                    with ai_context(email=uid, action=ai_action(name, job)):
+                        pending = self._timed(name, started, stage, job)
+                    if isinstance(pending, Future):
+                        pending.add_done_callback(
+                            lambda future, index=index, started=started: self.lanes.submit(
+                                "interactive", self._execute, job_id, record, index, "interactive",
+                                (future, started)))
+                        handed_off = True
+                        return
+                if isinstance(pending, Future):
+                    job.update(self._timed(name, started, pending.result))
+                metrics.observe(f"stage.{name}", time.monotonic() - started)
+                timings[name] = round(time.monotonic() - started, 2)
+                self.journal.finish_stage(job_id, name, job, timings)
+            self.journal.complete(job_id, job["result"])
+            metrics.inc("emails_total", outcome="done")
+            spans = ", ".join(f"{stage} {secs:.1f}s" for stage, secs in timings.items())
+            log.info(f"Finished processing UID {uid}: {job['result']} ({spans})")
+        except LeaseLost as e:
+            log.warning(f"Stopped processing UID {uid} after its {name} stage: {e}")
+            seen = None
+        except Exception as e:
+            retry_in = None
+            if record["attempts"] < JOB_MAX_ATTEMPTS:
+                retry_in = JOB_RETRY_DELAY * 2 ** (record["attempts"] - 1)
+            if not self.journal.fail(job_id, f"{name}: {e}", retry_in=retry_in):
+                log.warning(f"UID {uid} failed in {name} stage after another instance took it over: {e}")
+                seen = None
+            elif retry_in is not None:
+                log.warning(f"Error processing email UID {uid} in {name} stage "
+                            f"(attempt {record['attempts']}/{JOB_MAX_ATTEMPTS}): {e}. "
+                            f"Retrying in {retry_in}s")
+                metrics.inc("emails_total", outcome="retried")
+                seen = None
+            else:
+                metrics.inc("emails_total", outcome="failed")
+                log.error(f"Error processing email UID {uid}: {e} -- giving up "
+                          f"after {record['attempts']} attempts")
+                send_error_reply(e)
+        finally:
+            if not handed_off:
+                self._finish(job_id, seen)
+
+    @staticmethod
+    def _timed(name: str, started: float, fn, *args):
+        """Call fn; if it raises, count the error and the time since `started` for the stage."""
+        try:
+            return fn(*args)
+        except Exception:
+            metrics.inc("span_errors_total", span=f"stage.{name}")
+            metrics.observe(f"stage.{name}", time.monotonic() - started)
+            raise
+
+    def _finish(self, job_id: int, seen):
+        self._done.put((job_id, seen))
+        os.write(self._wake_w, b"\0")
+
+    def collect(self) -> list:
+        """Return (uidvalidity, uid) of emails finished since the last call --
+        done, or failed for good -- so the main loop can mark them seen."""
+        try:
+            while os.read(self.wake_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        finished = []
+        while True:
+            try:
+                job_id, seen = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._in_flight.discard(job_id)
+            if seen is not None:
+                self._completed_at.append(time.monotonic())
+                finished.append(seen)
+        return finished
+
+    def report_throughput(self):
+        """Log emails/minute every THROUGHPUT_LOG_INTERVAL seconds."""
+        now = time.monotonic()
+        while self._completed_at and now - self._completed_at[0] > THROUGHPUT_LOG_INTERVAL:
+            self._completed_at.popleft()
+        if now - self._last_report < THROUGHPUT_LOG_INTERVAL:
+            return
+        self._last_report = now
+        if self._completed_at or self._in_flight:
+            rate = len(self._completed_at) * 60 / THROUGHPUT_LOG_INTERVAL
+            log.info(
+                f"Throughput: {rate:.1f} emails/min "
+                f"({len(self._completed_at)} done in last {THROUGHPUT_LOG_INTERVAL}s, "
+                f"{len(self._in_flight)} in flight, {self.workers} workers)"
+            )
+            lanes = ", ".join(
+                f"{name} {lane['running']}/{lane['workers']} running, {lane['queued']} queued"
+                + (f" (oldest {lane['oldest_wait']:.0f}s)" if lane["queued"] else "")
+                for name, lane in self.lanes.stats().items()
+            )
+            log.info(f"Lanes: {lanes}")
+            log.info(f"AI cache: {ai_cache.stats()}")
+            log.info(f"Jobs: {self.journal.stats()}")
+            instances = self.journal.instances()
+            if len(instances) > 1:
+                log.info(f"Cluster: {len(instances)} live instances ({', '.join(instances)})")
+            log.info(f"Outbox: {outbox.pending()} repl(ies) waiting")
+
 # ---------------------------------------------------------------------------
 # Main loop
 # ---------------------------------------------------------------------------
 
 def main():
-    """Main polling loop -- check for new emails every POLL_INTERVAL seconds."""
+    """Main loop -- IMAP IDLE push over one connection, polling as fallback.
+
+    The main thread owns the IMAP connection (ingest); classification,
+    editing, deploys and replies run on the EmailPipeline worker pool,
+    and replies are delivered by the Outbox sender.
+    """
     if not OPENROUTER_API_KEY:
         log.error("OPENROUTER_API_KEY not set. Source ~/.env first.")
         sys.exit(1)
@@ -471,63 +3767,102 @@ def main():
     log.info("Email Editor started -- monitoring for emails")
     log.info(f"  IMAP: {EMAIL_USER} @ {IMAP_HOST}")
     log.info(f"  Allowed sender: {ALLOWED_SENDER}")
-    log.info(f"  Poll interval: {POLL_INTERVAL}s")
+    log.info(f"  Workers: {WORKER_POOL_SIZE} interactive, {BATCH_WORKERS} batch")
+    log.info(f"  Instance: {INSTANCE_ID}")
     log.info(f"  Project: {PROJECT_DIR}")
     log.info("=" * 60)
 
     consecutive_fails = 0
+    conn = None
+    push_mode = False
+    inbox_dirty = True
+    unmarked = []   # finished (uidvalidity, uid) not yet marked seen, kept across reconnects
+    sync_state = load_sync_state()
+    pipeline = EmailPipeline()
+    outbox.start()   # also sends replies left queued by a previous run
+    start_metrics_server()
+    threading.Thread(target=hugo_server.ensure_running, name="hugo-start", daemon=True).start()
+    recovered = pipeline.journal.recover()
+    if recovered:
+        log.info(f"Resuming {recovered} job(s) abandoned by a stopped instance")
 
     while True:
         try:
-            conn = connect_imap()
-            rescue_from_junk(conn)
-            uids = get_unread_from_sender(conn)
+            if conn is None:
+                with metrics.span("imap.connect"):
+                    conn = connect_imap()
+                    push_mode = supports_idle(conn)
+                    inbox_dirty = select_inbox(conn, sync_state)
+                if push_mode:
+                    log.info(f"IMAP push mode (IDLE, re-issued every {JUNK_CHECK_INTERVAL}s "
+                             f"for the Junk check)")
+                else:
+                    log.info(f"Server lacks IDLE -- polling every {POLL_INTERVAL}s")
+
+            uidvalidity = sync_state["INBOX"]["uidvalidity"]
+            unmarked += pipeline.collect()
+            while unmarked:
+                job_uidvalidity, uid = unmarked[0]
+                if job_uidvalidity == uidvalidity:
+                    mark_as_seen(conn, uid)
+                unmarked.pop(0)   # only once marked -- a dropped connection retries the rest
+            pipeline.dispatch()
+            pipeline.report_throughput()
+
+            with metrics.span("imap.junk"):
+                if rescue_from_junk(conn, sync_state):
+                    inbox_dirty = True
+            with metrics.span("imap.search"):
+                uids = get_unread_from_sender(conn, sync_state) if inbox_dirty else []
+            known = pipeline.journal.known_uids(uidvalidity, uids)
+            uids = [uid for uid in uids if uid not in known]
+            inbox_dirty = False
 
             if uids:
                 log.info(f"Found {len(uids)} unread email(s) from {ALLOWED_SENDER}")
 
+            with metrics.span("imap.fetch"):
+                emails = fetch_emails(conn, uids)
+            metrics.inc("emails_ingested_total", len(uids))
             for uid in uids:
-                try:
-                    email_data = fetch_email(conn, uid)
-                    if email_data is None:
-                        mark_as_seen(conn, uid)
-                        continue
-
-                    result = process_email(email_data)
+                if emails[uid] is None:
                     mark_as_seen(conn, uid)
-                    log.info(f"Finished processing: {result}")
-
-                except Exception as e:
-                    log.error(f"Error processing email UID {uid}: {e}")
-                    # Try to reply with error
-                    try:
-                        send_reply(
-                            ALLOWED_SENDER,
-                            "Email Editor Error",
-                            f"Something went wrong processing your email:\n\n{e}\n\n"
-                            "Please try again or check the logs."
-                        )
-                    except Exception:
-                        pass
-                    # Mark as seen so we don't retry endlessly
+                elif not pipeline.submit(uidvalidity, uid, emails[uid]):
+                    log.info(f"UID {uid.decode()} duplicates an already journaled Message-ID")
                     mark_as_seen(conn, uid)
-
-            try:
-                conn.logout()
-            except Exception:
-                pass
+            if uids:
+                # Everything up to here is journaled -- ingestion is done with it
+                advance_watermark(sync_state, "INBOX", max(uids, key=int))
 
             consecutive_fails = 0
-            time.sleep(POLL_INTERVAL)
+            # Mail that arrived while we were busy shows up as EXISTS
+            inbox_dirty = _drain_new_mail(conn)
+            if inbox_dirty:
+                continue
+            if push_mode:
+                inbox_dirty = idle_wait(conn, JUNK_CHECK_INTERVAL, wake_fd=pipeline.wake_fd)
+                if inbox_dirty:
+                    log.info("IDLE: new mail notification")
+            else:
+                select.select([pipeline.wake_fd], [], [], POLL_INTERVAL)
+                conn.noop()
+                inbox_dirty = _drain_new_mail(conn)
 
         except Exception as e:
+            if conn is not None:
+                try:
+                    conn.logout()
+                except Exception:
+                    pass
+                conn = None
+            inbox_dirty = True
             consecutive_fails += 1
             if consecutive_fails >= MAX_CONSECUTIVE_FAILS:
                 wait = BACKOFF_INTERVAL
                 log.error(f"IMAP connection failed ({consecutive_fails}x): {e}. Backing off {wait}s")
             else:
                 wait = POLL_INTERVAL
-                log.warning(f"IMAP error: {e}. Retrying in {wait}s")
+                log.warning(f"IMAP error: {e}. Reconnecting in {wait}s")
             time.sleep(wait)
 
 
@@ -13,6 +13,7 @@ async function generateContent(prompt, apiKey) {
   for (const model of MODELS) {
     try {
       console.log(`Trying ${model.name}...`);
+      const started = Date.now();
       const response = await fetch('https://openrouter.ai/api/v1/chat/completions', {
         method: 'POST',
         headers: {
@@ -29,6 +30,7 @@ async function generateContent(prompt, apiKey) {
           ],
           temperature: 0.7,
           max_tokens: 8000,
+          usage: { include: true },
         }),
       });
 
@@ -38,6 +40,10 @@ async function generateContent(prompt, apiKey) {
       }
 
       const data = await response.json();
+      if (data.usage) {
+        // Picked up by the email editor's token/cost accounting
+        console.log(`Usage: ${model.id} ${Date.now() - started}ms ${JSON.stringify(data.usage)}`);
+      }
       const content = data.choices?.[0]?.message?.content;
 
       if (!content || content.length < 500) {